@@ -0,0 +1,219 @@
+"""
+On-disk cache of the fitted artifacts from my_ca1.py: the CountVectorizer (and its vocabulary), the CSR feature matrices
+for the train and test splits, the labels, and the fitted LinearSVC and MultinomialNB models.
+
+Entries are keyed by a hash of everything that determines them: the raw TSV bytes, the split seed/size, and the
+vectorizer and model params. Change any of those and you get a new key (a miss), so a stale entry is never returned.
+On a hit, nothing is re-fit, and scoring can start right away.
+
+> cache = ArtifactCache("~/.cache/nlp220/ca1", max_bytes=500_000_000)
+> artifacts = fit_or_load(cache, tsv_bytes)
+> svm_pred = artifacts.models["svm"].predict(artifacts.X_test_feat)
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.svm import LinearSVC
+
+# bump this if the layout of an entry changes, so old entries are treated as misses
+CACHE_FORMAT_VERSION: int = 1
+
+
+@dataclass
+class FittedArtifacts:
+    vectorizer: CountVectorizer
+    X_train_feat: sp.csr_matrix
+    X_test_feat: sp.csr_matrix
+    y_train: np.ndarray
+    y_test: np.ndarray
+    models: Dict[str, BaseEstimator]
+
+
+def cache_key(data: bytes, random_state: int, test_size: float, vectorizer_params: Dict[str, Any],
+              model_params: Dict[str, Dict[str, Any]]) -> str:
+    """
+    A hex digest of the data and every parameter that affects the fitted artifacts.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(hashlib.sha256(data).digest())
+    # sort_keys so that the same params in a different order give the same key
+    hasher.update(json.dumps({"version": CACHE_FORMAT_VERSION, "random_state": random_state, "test_size": test_size,
+                              "vectorizer": vectorizer_params, "models": model_params},
+                             sort_keys=True, default=str).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class ArtifactCache:
+    """
+    A directory with one sub-directory per cache key. When the total size goes over max_bytes, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        self.cache_dir: str = os.path.expanduser(cache_dir)
+        self.max_bytes: Optional[int] = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[FittedArtifacts]:
+        entry_dir: str = self._entry_dir(key)
+        if not os.path.exists(entry_dir):
+            return None
+        with open(os.path.join(entry_dir, "vectorizer.pkl"), "rb") as f:
+            vectorizer: CountVectorizer = pickle.load(f)
+        with open(os.path.join(entry_dir, "models.pkl"), "rb") as f:
+            models: Dict[str, BaseEstimator] = pickle.load(f)
+        labels = np.load(os.path.join(entry_dir, "labels.npz"))
+        artifacts = FittedArtifacts(vectorizer=vectorizer,
+                                    X_train_feat=sp.load_npz(os.path.join(entry_dir, "X_train_feat.npz")).tocsr(),
+                                    X_test_feat=sp.load_npz(os.path.join(entry_dir, "X_test_feat.npz")).tocsr(),
+                                    y_train=labels["y_train"], y_test=labels["y_test"], models=models)
+        # touch the entry, so eviction treats it as recently used
+        os.utime(entry_dir)
+        return artifacts
+
+    def put(self, key: str, artifacts: FittedArtifacts) -> None:
+        # write everything into a temporary directory first and rename it into place, so a crash half-way through
+        # never leaves a partial entry that looks like a hit
+        tmp_dir: str = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            with open(os.path.join(tmp_dir, "vectorizer.pkl"), "wb") as f:
+                pickle.dump(artifacts.vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(tmp_dir, "models.pkl"), "wb") as f:
+                pickle.dump(artifacts.models, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # uncompressed: these are read on every hit, and decompression would eat into the load time
+            sp.save_npz(os.path.join(tmp_dir, "X_train_feat.npz"), artifacts.X_train_feat, compressed=False)
+            sp.save_npz(os.path.join(tmp_dir, "X_test_feat.npz"), artifacts.X_test_feat, compressed=False)
+            np.savez(os.path.join(tmp_dir, "labels.npz"), y_train=artifacts.y_train, y_test=artifacts.y_test)
+            self.invalidate(key)
+            os.replace(tmp_dir, self._entry_dir(key))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.evict()
+
+    def invalidate(self, key: str) -> bool:
+        """
+        Remove one entry. Returns whether there was anything to remove.
+        """
+        entry_dir: str = self._entry_dir(key)
+        if not os.path.exists(entry_dir):
+            return False
+        shutil.rmtree(entry_dir)
+        return True
+
+    def clear(self) -> None:
+        for key, _, _ in self._entries():
+            self.invalidate(key)
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        """
+        (key, last used time, size in bytes) for each complete entry.
+        """
+        entries: List[Tuple[str, float, int]] = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir: str = self._entry_dir(key)
+            if key.startswith(".tmp-") or not os.path.isdir(entry_dir):
+                continue
+            size: int = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+            entries.append((key, os.stat(entry_dir).st_mtime, size))
+        return entries
+
+    def evict(self) -> List[str]:
+        """
+        Remove least recently used entries until the cache fits in max_bytes. Returns the evicted keys.
+        """
+        if self.max_bytes is None:
+            return []
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total_bytes: int = sum(size for _, _, size in entries)
+        evicted: List[str] = []
+        for key, _, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self.invalidate(key)
+            total_bytes -= size
+            evicted.append(key)
+        return evicted
+
+
+def fit_artifacts(data: bytes, random_state: int = 42, test_size: float = 0.2,
+                  vectorizer_params: Optional[Dict[str, Any]] = None,
+                  model_params: Optional[Dict[str, Dict[str, Any]]] = None) -> FittedArtifacts:
+    """
+    Steps 1-3 of my_ca1.py: load, split, featurize and fit both models.
+    """
+    vectorizer_params = {"lowercase": False} if vectorizer_params is None else vectorizer_params
+    model_params = model_params or {}
+    df: pd.DataFrame = pd.read_csv(io.BytesIO(data), delimiter="\t", names=["label", "text"])
+    df['label'] = df['label'] == 'spam'
+    X_train, X_test, y_train, y_test = train_test_split(df['text'], df['label'], test_size=test_size,
+                                                        random_state=random_state)
+    vectorizer: CountVectorizer = CountVectorizer(**vectorizer_params)
+    X_train_feat = vectorizer.fit_transform(X_train)
+    X_test_feat = vectorizer.transform(X_test)
+    models: Dict[str, BaseEstimator] = {"svm": LinearSVC(**model_params.get("svm", {})),
+                                        "nb": MultinomialNB(**model_params.get("nb", {}))}
+    for model in models.values():
+        model.fit(X_train_feat, y_train)
+    return FittedArtifacts(vectorizer=vectorizer, X_train_feat=X_train_feat.tocsr(), X_test_feat=X_test_feat.tocsr(),
+                           y_train=y_train.to_numpy(), y_test=y_test.to_numpy(), models=models)
+
+
+def fit_or_load(cache: ArtifactCache, data: bytes, random_state: int = 42, test_size: float = 0.2,
+                vectorizer_params: Optional[Dict[str, Any]] = None,
+                model_params: Optional[Dict[str, Dict[str, Any]]] = None) -> FittedArtifacts:
+    """
+    Return cached artifacts for these inputs if present, otherwise fit them and add them to the cache.
+    """
+    vectorizer_params = {"lowercase": False} if vectorizer_params is None else vectorizer_params
+    model_params = model_params or {}
+    key: str = cache_key(data, random_state, test_size, vectorizer_params, model_params)
+    artifacts: Optional[FittedArtifacts] = cache.get(key)
+    if artifacts is None:
+        artifacts = fit_artifacts(data, random_state=random_state, test_size=test_size,
+                                  vectorizer_params=vectorizer_params, model_params=model_params)
+        cache.put(key, artifacts)
+    return artifacts
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from sklearn.metrics import accuracy_score, f1_score
+
+    # data_registry.py lives at the root of this repo
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from data_registry import fetch
+
+    # the registry's verified local copy, downloaded only if there isn't one yet
+    with open(fetch("sms_spam"), "rb") as f:
+        tsv_bytes: bytes = f.read()
+
+    cache = ArtifactCache(os.path.join(tempfile.gettempdir(), "nlp220_ca1_cache"), max_bytes=200_000_000)
+    for attempt in ("first run (miss)", "second run (hit)"):
+        start: float = time.perf_counter()
+        artifacts = fit_or_load(cache, tsv_bytes)
+        print(f"{attempt}: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for name, model in artifacts.models.items():
+        y_pred = model.predict(artifacts.X_test_feat)
+        print(f"{name} Accuracy: {accuracy_score(artifacts.y_test, y_pred):3f}")
+        print(f"{name} F1: {f1_score(artifacts.y_test, y_pred):3f}")
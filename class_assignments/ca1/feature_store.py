@@ -0,0 +1,259 @@
+"""
+A tokenize-once feature store for the SMS spam messages: build CountVectorizer-style sparse matrices for any n-gram
+range or min_df without re-tokenizing the corpus.
+
+Every CountVectorizer(...).fit_transform call in my_ca1.py re-tokenizes every message. When sweeping n-gram settings
+(or just swapping the downstream model), the tokenization is the same every time, so here we do it once:
+- each distinct token gets an integer id (the store's vocabulary, which grows as documents are appended)
+- each document is stored as its sequence of token ids, all concatenated into one uint32 array, plus an offsets array:
+  document i is tokens[offsets[i]:offsets[i + 1]] (like the indptr of a CSR matrix)
+
+An n-gram is then just n consecutive ids, which numpy can slice out for every document at once. fit_features picks
+the n-gram features (applying min_df / max_df) from some documents, e.g. the training split, and transform builds the
+CSR matrix for any documents using those fitted features. The result matches
+CountVectorizer(lowercase=False, ngram_range=..., min_df=...) exactly: same columns (sorted n-gram strings), same
+counts.
+
+Appending documents grows the vocabulary. freeze() stops that: tokens not seen before are stored as out-of-vocabulary
+(OOV), and never match a feature, the same as CountVectorizer ignoring unknown words at transform time.
+
+> store = FeatureStore.from_texts(df['text'])
+> space = store.fit_features(train_idx, ngram_range=(1, 2), min_df=2)
+> X_train_feat, X_test_feat = store.transform(train_idx, space), store.transform(test_idx, space)
+"""
+import json
+import numbers
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+
+# stored in place of a token id for tokens appended after freeze()
+OOV_ID: int = np.iinfo(np.uint32).max
+
+
+def default_analyzer() -> Callable[[str], List[str]]:
+    # the exact tokenization CountVectorizer(lowercase=False) uses for unigrams: its default token_pattern
+    return CountVectorizer(lowercase=False).build_analyzer()
+
+
+@dataclass
+class FeatureSpace:
+    """
+    The n-gram features fitted by FeatureStore.fit_features. keys[n] are the sorted int64 keys of the n-grams of
+    length n that are features, and columns[n] the matrix column of each.
+    """
+    ngram_range: Tuple[int, int]
+    # n-gram keys are token ids in base `base`, so keys from one fit stay valid after the store's vocabulary grows
+    base: int
+    keys: Dict[int, np.ndarray]
+    columns: Dict[int, np.ndarray]
+    feature_names: List[str]
+
+    @property
+    def vocabulary_(self) -> Dict[str, int]:
+        # named like CountVectorizer's attribute, for comparison
+        return {name: column for column, name in enumerate(self.feature_names)}
+
+
+class FeatureStore:
+
+    def __init__(self, analyzer: Optional[Callable[[str], List[str]]] = None):
+        self.analyzer: Callable[[str], List[str]] = analyzer or default_analyzer()
+        self.vocab: List[str] = []
+        self.token_to_id: Dict[str, int] = {}
+        self.frozen: bool = False
+        self.tokens: np.ndarray = np.empty(0, dtype=np.uint32)
+        self.offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], analyzer: Optional[Callable[[str], List[str]]] = None) -> "FeatureStore":
+        store = cls(analyzer)
+        store.append(texts)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def freeze(self) -> None:
+        self.frozen = True
+
+    def _token_id(self, token: str) -> int:
+        token_id: Optional[int] = self.token_to_id.get(token)
+        if token_id is None:
+            if self.frozen:
+                return OOV_ID
+            token_id = len(self.vocab)
+            self.token_to_id[token] = token_id
+            self.vocab.append(token)
+        return token_id
+
+    def append(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Tokenize and add documents. This is the only place tokenization happens. Returns the new documents' indices.
+        """
+        first_new: int = len(self)
+        new_ids: List[int] = []
+        lengths: List[int] = []
+        for text in texts:
+            ids: List[int] = [self._token_id(token) for token in self.analyzer(text)]
+            new_ids.extend(ids)
+            lengths.append(len(ids))
+        self.tokens = np.concatenate((self.tokens, np.asarray(new_ids, dtype=np.uint32)))
+        self.offsets = np.concatenate((self.offsets, self.offsets[-1] + np.cumsum(lengths, dtype=np.int64)))
+        return np.arange(first_new, len(self))
+
+    def _ngram_keys(self, doc_indices: np.ndarray, n: int, base: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Every n-gram of the given documents, as (row in doc_indices, int64 key). N-grams never cross a document
+        boundary, and n-grams containing an OOV token (or one added after the feature space's fit) are dropped.
+        """
+        starts: np.ndarray = self.offsets[doc_indices]
+        num_grams: np.ndarray = np.maximum(self.offsets[doc_indices + 1] - starts - n + 1, 0)
+        rows: np.ndarray = np.repeat(np.arange(len(doc_indices)), num_grams)
+        # position of each n-gram's first token: starts[row] + (0, 1, ..., num_grams[row] - 1)
+        first_of_row: np.ndarray = np.concatenate(([0], np.cumsum(num_grams)[:-1]))
+        positions: np.ndarray = np.repeat(starts - first_of_row, num_grams) + np.arange(num_grams.sum())
+        keys: np.ndarray = np.zeros(len(positions), dtype=np.int64)
+        valid: np.ndarray = np.ones(len(positions), dtype=bool)
+        for k in range(n):
+            ids: np.ndarray = self.tokens[positions + k].astype(np.int64)
+            valid &= ids < base
+            keys = keys * base + ids
+        return rows[valid], keys[valid]
+
+    def fit_features(self, doc_indices: Sequence[int], ngram_range: Tuple[int, int] = (1, 1),
+                     min_df: Union[int, float] = 1, max_df: Union[int, float] = 1.0) -> FeatureSpace:
+        """
+        Choose n-gram features from these documents, with CountVectorizer's min_df / max_df semantics (an int is a
+        number of documents, a float a fraction of them).
+        """
+        doc_indices = np.asarray(doc_indices, dtype=np.int64)
+        base: int = len(self.vocab)
+        min_n, max_n = ngram_range
+        if base ** max_n >= 2 ** 63:
+            raise ValueError(f"{max_n}-grams over {base} tokens don't fit in int64 keys, use a smaller ngram_range")
+        num_docs: int = len(doc_indices)
+        # numbers.Integral, like CountVectorizer: np.int64 (e.g. from a parameter grid) is also a number of documents
+        min_count: float = min_df if isinstance(min_df, numbers.Integral) else min_df * num_docs
+        max_count: float = max_df if isinstance(max_df, numbers.Integral) else max_df * num_docs
+
+        keys: Dict[int, np.ndarray] = {}
+        names: List[Tuple[str, int, int]] = []  # (feature name, n, index into keys[n])
+        for n in range(min_n, max_n + 1):
+            rows, gram_keys = self._ngram_keys(doc_indices, n, base)
+            unique_keys, inverse = np.unique(gram_keys, return_inverse=True)
+            # document frequency: count each (document, n-gram) pair once
+            unique_pairs: np.ndarray = np.unique(rows.astype(np.int64) * len(unique_keys) + inverse)
+            doc_freq: np.ndarray = np.bincount(unique_pairs % max(len(unique_keys), 1), minlength=len(unique_keys))
+            keys[n] = unique_keys[(doc_freq >= min_count) & (doc_freq <= max_count)]
+            for i, key in enumerate(keys[n]):
+                names.append((" ".join(self._decode(int(key), n, base)), n, i))
+
+        # CountVectorizer's columns are in sorted order of the feature strings
+        names.sort(key=lambda name: name[0])
+        columns: Dict[int, np.ndarray] = {n: np.empty(len(keys[n]), dtype=np.int64) for n in keys}
+        for column, (_, n, i) in enumerate(names):
+            columns[n][i] = column
+        return FeatureSpace(ngram_range=ngram_range, base=base, keys=keys, columns=columns,
+                            feature_names=[name for name, _, _ in names])
+
+    def _decode(self, key: int, n: int, base: int) -> List[str]:
+        ids: List[int] = []
+        for _ in range(n):
+            key, token_id = divmod(key, base)
+            ids.append(token_id)
+        return [self.vocab[token_id] for token_id in reversed(ids)]
+
+    def transform(self, doc_indices: Sequence[int], space: FeatureSpace) -> sp.csr_matrix:
+        """
+        The document-term count matrix for these documents, with one column per feature in space.
+        """
+        doc_indices = np.asarray(doc_indices, dtype=np.int64)
+        all_rows: List[np.ndarray] = []
+        all_columns: List[np.ndarray] = []
+        for n, feature_keys in space.keys.items():
+            rows, gram_keys = self._ngram_keys(doc_indices, n, space.base)
+            # look every n-gram up in the sorted feature keys at once
+            positions: np.ndarray = np.minimum(np.searchsorted(feature_keys, gram_keys), max(len(feature_keys) - 1, 0))
+            found: np.ndarray = feature_keys[positions] == gram_keys if len(feature_keys) else \
+                np.zeros(len(gram_keys), dtype=bool)
+            all_rows.append(rows[found])
+            all_columns.append(space.columns[n][positions[found]])
+        rows = np.concatenate(all_rows) if all_rows else np.empty(0, dtype=np.int64)
+        columns = np.concatenate(all_columns) if all_columns else np.empty(0, dtype=np.int64)
+        matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, columns)),
+                               shape=(len(doc_indices), len(space.feature_names)))
+        # duplicate (row, column) entries are summed into counts; sorted indices, like CountVectorizer's output
+        matrix.sum_duplicates()
+        matrix.sort_indices()
+        return matrix
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "tokens.npy"), self.tokens)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        with open(os.path.join(directory, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump({"vocab": self.vocab, "frozen": self.frozen}, f)
+
+    @classmethod
+    def load(cls, directory: str, analyzer: Optional[Callable[[str], List[str]]] = None,
+             mmap: bool = False) -> "FeatureStore":
+        """
+        Load a saved store. With mmap=True the token arrays are memory-mapped (read-only): fine for building
+        matrices, but append copies them into memory.
+        """
+        store = cls(analyzer)
+        with open(os.path.join(directory, "vocab.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        store.vocab = state["vocab"]
+        store.token_to_id = {token: token_id for token_id, token in enumerate(store.vocab)}
+        store.frozen = state["frozen"]
+        mmap_mode: Optional[str] = "r" if mmap else None
+        store.tokens = np.load(os.path.join(directory, "tokens.npy"), mmap_mode=mmap_mode)
+        store.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mmap_mode)
+        return store
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    parser = argparse.ArgumentParser(description="Sweep n-gram settings over a tokenize-once feature store")
+    parser.add_argument("--tsv", required=True, help="path to SMSSpamCollection.tsv")
+    args = parser.parse_args()
+
+    df: pd.DataFrame = pd.read_csv(args.tsv, delimiter="\t", names=["label", "text"])
+    train_idx, test_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+
+    start: float = time.perf_counter()
+    # only the training split grows the vocabulary; test messages are appended after freezing, like unseen data
+    store = FeatureStore.from_texts(df['text'].iloc[train_idx])
+    store.freeze()
+    test_docs: np.ndarray = store.append(df['text'].iloc[test_idx])
+    train_docs: np.ndarray = np.arange(len(train_idx))
+    print(f"tokenized {len(store)} messages once: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for ngram_range, min_df in (((1, 1), 1), ((1, 2), 1), ((1, 2), 2), ((1, 3), 2)):
+        start = time.perf_counter()
+        space: FeatureSpace = store.fit_features(train_docs, ngram_range=ngram_range, min_df=min_df)
+        X_train_feat = store.transform(train_docs, space)
+        X_test_feat = store.transform(test_docs, space)
+        store_ms: float = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        vectorizer = CountVectorizer(lowercase=False, ngram_range=ngram_range, min_df=min_df)
+        expected_train = vectorizer.fit_transform(df['text'].iloc[train_idx])
+        expected_test = vectorizer.transform(df['text'].iloc[test_idx])
+        vectorizer_ms: float = (time.perf_counter() - start) * 1000
+
+        assert space.vocabulary_ == vectorizer.vocabulary_
+        assert (X_train_feat != expected_train).nnz == 0 and (X_test_feat != expected_test).nnz == 0
+        print(f"ngram_range={ngram_range}, min_df={min_df}: {len(space.feature_names)} features, "
+              f"feature store {store_ms:.1f}ms vs CountVectorizer {vectorizer_ms:.1f}ms (identical matrices)")
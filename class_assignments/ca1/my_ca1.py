@@ -1,3 +1,6 @@
+import os
+import sys
+
 import pandas as pd
 from sklearn.metrics import f1_score, accuracy_score
 from sklearn.model_selection import train_test_split
@@ -5,21 +8,38 @@ from sklearn.naive_bayes import MultinomialNB
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.svm import LinearSVC
 
+from stage_metrics import PipelineMetrics
+
+# Each stage below runs in metrics.stage(...), which records its wall/CPU time (and, with STAGE_METRICS_TRACK_MEMORY=1,
+# peak memory) plus any counts we attach. A summary is printed at the end. See stage_metrics.py for profiling a stage
+# and exporting to Prometheus
+metrics: PipelineMetrics = PipelineMetrics.from_env("spam_pipeline")
+
 # =========================================== 1. Loading/Data Processing/train_test_split ===========================================
 
 # Neat trick: you can pass a url directly to read_csv. This works well for small datasets like this one, which 
 # can be downloaded efficiently on each run. Make sure to use the 'Raw' link, or replace this with a local path.
 PATH_TO_TSV: str = "https://raw.githubusercontent.com/kingb12/nlp220_section_examples/main/SMSSpamCollection.tsv"
 
-# Loading the TSV into pandas
-df: pd.DataFrame = pd.read_csv(PATH_TO_TSV, delimiter="\t", names=["label", "text"])
+# Update: instead of downloading on every run, fetch downloads once into a local cache (streamed, with a checksum), and
+# re-uses it after that. See data_registry.py at the root of this repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from data_registry import fetch
+PATH_TO_TSV = fetch("sms_spam")
 
-# Creating a numeric label (1 for spam, 0 for ham)
-df['label'] = df['label'] == 'spam'
-assert 0 < df['label'].mean() < 1
+with metrics.stage("load") as stage:
+    # Loading the TSV into pandas
+    df: pd.DataFrame = pd.read_csv(PATH_TO_TSV, delimiter="\t", names=["label", "text"])
 
-# Splitting the data into a train/test split. Be sure to do in one call! Calling separately on (X, y) implicitly shuffles supervised pairs
-X_train, X_test, y_train, y_test = train_test_split(df['text'], df['label'], test_size=0.2, random_state=42)
+    # Creating a numeric label (1 for spam, 0 for ham)
+    df['label'] = df['label'] == 'spam'
+    assert 0 < df['label'].mean() < 1
+    stage.record(rows=len(df))
+
+with metrics.stage("split") as stage:
+    # Splitting the data into a train/test split. Be sure to do in one call! Calling separately on (X, y) implicitly shuffles supervised pairs
+    X_train, X_test, y_train, y_test = train_test_split(df['text'], df['label'], test_size=0.2, random_state=42)
+    stage.record(train_rows=len(X_train), test_rows=len(X_test))
 
 # =========================================== 2. Feature Engineering ================================================================
 
@@ -28,26 +48,35 @@ X_train, X_test, y_train, y_test = train_test_split(df['text'], df['label'], tes
 vectorizer: CountVectorizer = CountVectorizer(lowercase=False)
 
 
-# important: only 'fit' with training data. Defining your features with test data gives an unrealistic evaluation of unseen data 
-# (e.g. you might add words to your vocabulary that aren't in training data, and should otherwise be treated as unseen)
-X_train_feat = vectorizer.fit_transform(X_train)
-X_test_feat = vectorizer.transform(X_test)
+with metrics.stage("featurize") as stage:
+    # important: only 'fit' with training data. Defining your features with test data gives an unrealistic evaluation of unseen data 
+    # (e.g. you might add words to your vocabulary that aren't in training data, and should otherwise be treated as unseen)
+    X_train_feat = vectorizer.fit_transform(X_train)
+    X_test_feat = vectorizer.transform(X_test)
+    stage.record(vocab_size=len(vectorizer.vocabulary_), train_nnz=X_train_feat.nnz, test_nnz=X_test_feat.nnz)
 
 # =========================================== 3 & 4. Model Training & Evaluation ====================================================
 
-# Create a SVM classifier using LinearSVC. Also acceptable: SGDClassifier with default params/hinge loss (this is an identical model optimized by other means)
-svm = LinearSVC()
-svm.fit(X_train_feat, y_train)
-y_svm = svm.predict(X_test_feat)
+with metrics.stage("train_evaluate") as stage:
+    # Create a SVM classifier using LinearSVC. Also acceptable: SGDClassifier with default params/hinge loss (this is an identical model optimized by other means)
+    svm = LinearSVC()
+    svm.fit(X_train_feat, y_train)
+    y_svm = svm.predict(X_test_feat)
+
+    print(f"SVM Accuracy: {accuracy_score(y_test, y_svm):3f}")
+    print(f"SVM F1: {f1_score(y_test, y_svm):3f}")
 
-print(f"SVM Accuracy: {accuracy_score(y_test, y_svm):3f}")
-print(f"SVM F1: {f1_score(y_test, y_svm):3f}")
+    # Create a Multinomial Naive Bayes Classifer using MultinomialNB. We gave points for GaussianNB, but this is actually a different model!
+    # When choosing between these, consider whether your features are predominately discrete (MultinomialNB) or continuous (GaussianNB)
+    nb = MultinomialNB()
+    nb.fit(X_train_feat, y_train)
+    y_nb = nb.predict(X_test_feat)
 
-# Create a Multinomial Naive Bayes Classifer using MultinomialNB. We gave points for GaussianNB, but this is actually a different model!
-# When choosing between these, consider whether your features are predominately discrete (MultinomialNB) or continuous (GaussianNB)
-nb = MultinomialNB()
-nb.fit(X_train_feat, y_train)
-y_nb = nb.predict(X_test_feat)
+    print(f"NB Accuracy: {accuracy_score(y_test, y_nb):3f}")
+    print(f"NB F1: {f1_score(y_test, y_nb):3f}")
+    stage.record_score(svm_accuracy=accuracy_score(y_test, y_svm), svm_f1=f1_score(y_test, y_svm),
+                       nb_accuracy=accuracy_score(y_test, y_nb), nb_f1=f1_score(y_test, y_nb))
 
-print(f"NB Accuracy: {accuracy_score(y_test, y_nb):3f}")
-print(f"NB F1: {f1_score(y_test, y_nb):3f}")
+# time (and memory) per stage, and the counts recorded above
+print(metrics.summary())
+metrics.export()
@@ -0,0 +1,120 @@
+"""
+Out-of-core version of my_ca1.py, for spam corpora that don't fit in memory.
+
+Three changes from the in-memory version:
+1) The TSV is streamed in chunks with read_csv(chunksize=...), so only one chunk is in memory at a time
+2) HashingVectorizer replaces CountVectorizer. It hashes each token to one of n_features columns, so there is no
+   vocabulary to fit (or to hold in memory), and any chunk can be featurized on its own
+3) Models are trained with partial_fit, one chunk at a time: MultinomialNB, and SGDClassifier with hinge loss (a linear
+   SVM, the same model as LinearSVC optimized by other means, see my_ca1.py)
+
+Since we never have the whole dataset to hand to train_test_split, each row is assigned to train or test by a seeded
+random draw. The same seed gives the same split on both passes: pass 1 trains, pass 2 evaluates on the held-out rows.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+
+CLASSES: np.ndarray = np.array([False, True])
+
+
+@dataclass
+class ConfusionCounts:
+    """
+    Running binary confusion counts, so we can compute accuracy and F1 without keeping predictions around.
+    """
+    tp: int = 0
+    fp: int = 0
+    fn: int = 0
+    tn: int = 0
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray) -> None:
+        self.tp += int(np.sum(y_true & y_pred))
+        self.fp += int(np.sum(~y_true & y_pred))
+        self.fn += int(np.sum(y_true & ~y_pred))
+        self.tn += int(np.sum(~y_true & ~y_pred))
+
+    def accuracy(self) -> float:
+        total: int = self.tp + self.fp + self.fn + self.tn
+        return (self.tp + self.tn) / total if total else 0.0
+
+    def f1(self) -> float:
+        # same as sklearn's f1_score: 0 when there are no true or predicted positives
+        denominator: int = 2 * self.tp + self.fp + self.fn
+        return 2 * self.tp / denominator if denominator else 0.0
+
+
+@dataclass
+class OutOfCoreResult:
+    models: Dict[str, BaseEstimator]
+    test_counts: Dict[str, ConfusionCounts] = field(default_factory=dict)
+    num_train: int = 0
+    num_test: int = 0
+
+
+def make_vectorizer(n_features: int = 2 ** 20) -> HashingVectorizer:
+    # alternate_sign=False keeps every feature value non-negative, which MultinomialNB requires (they're counts).
+    # lowercase=False, like the CountVectorizer in my_ca1.py
+    return HashingVectorizer(n_features=n_features, lowercase=False, alternate_sign=False)
+
+
+def stream_split(path: str, chunksize: int = 10_000, test_size: float = 0.2,
+                 random_state: int = 42) -> Iterator[Tuple[pd.Series, np.ndarray, np.ndarray]]:
+    """
+    Yield (texts, labels, is_test) for each chunk of the TSV. is_test is the same on every call with the same
+    random_state and chunksize.
+    """
+    rng = np.random.default_rng(random_state)
+    for chunk in pd.read_csv(path, delimiter="\t", names=["label", "text"], chunksize=chunksize):
+        labels: np.ndarray = (chunk['label'] == 'spam').to_numpy()
+        is_test: np.ndarray = rng.random(len(chunk)) < test_size
+        yield chunk['text'], labels, is_test
+
+
+def train_out_of_core(path: str, chunksize: int = 10_000, test_size: float = 0.2, random_state: int = 42,
+                      n_features: int = 2 ** 20) -> OutOfCoreResult:
+    vectorizer: HashingVectorizer = make_vectorizer(n_features)
+    result = OutOfCoreResult(models={"svm": SGDClassifier(loss="hinge", random_state=random_state),
+                                     "nb": MultinomialNB()})
+
+    # Pass 1: train on the training rows of each chunk
+    for texts, labels, is_test in stream_split(path, chunksize, test_size, random_state):
+        if not np.any(~is_test):
+            continue
+        features = vectorizer.transform(texts[~is_test])
+        for model in result.models.values():
+            # classes must be given up front: a chunk might not contain both
+            model.partial_fit(features, labels[~is_test], classes=CLASSES)
+        result.num_train += int(np.sum(~is_test))
+
+    # Pass 2: score the held-out rows, keeping only the confusion counts
+    result.test_counts = {name: ConfusionCounts() for name in result.models}
+    for texts, labels, is_test in stream_split(path, chunksize, test_size, random_state):
+        if not np.any(is_test):
+            continue
+        features = vectorizer.transform(texts[is_test])
+        for name, model in result.models.items():
+            result.test_counts[name].update(labels[is_test], model.predict(features).astype(bool))
+        result.num_test += int(np.sum(is_test))
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Out-of-core spam classifier training")
+    parser.add_argument("--tsv", required=True, help="path to SMSSpamCollection.tsv (or a bigger corpus like it)")
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    args = parser.parse_args()
+
+    result = train_out_of_core(args.tsv, chunksize=args.chunksize)
+    print(f"Trained on {result.num_train} messages, tested on {result.num_test}")
+    for name, label in (("svm", "SVM (SGD, hinge)"), ("nb", "NB")):
+        print(f"{label} Accuracy: {result.test_counts[name].accuracy():3f}")
+        print(f"{label} F1: {result.test_counts[name].f1():3f}")
@@ -0,0 +1,273 @@
+"""
+A small scoring service around the fitted CountVectorizer + LinearSVC/MultinomialNB from my_ca1.py.
+
+Vectorizing one message at a time pays the vectorizer's Python overhead on every call. Instead, requests are queued
+and micro-batched: a background thread waits for either max_batch_size messages or max_wait_ms after the first one
+arrives, whichever comes first, then vectorizes the whole batch with a single transform call and scores it.
+
+Two ways to serve it:
+- HTTP: POST /score with {"texts": ["...", ...]} returns {"labels": [...], "scores": [...]}. GET /stats returns latency
+  percentiles and throughput.
+- stdio: one message per line on stdin, one JSON result per line on stdout, in the same order.
+
+> python scoring_service.py --tsv SMSSpamCollection.tsv --model svm --mode http --port 8220
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction.text import CountVectorizer
+
+# (label, score): label is True for spam. For LinearSVC the score is the signed distance to the decision boundary, for
+# MultinomialNB it is P(spam)
+ScoredMessage = Tuple[bool, float]
+
+
+class SpamScorer:
+    """
+    Scores batches of raw messages with a fitted vectorizer and model.
+    """
+
+    def __init__(self, vectorizer: CountVectorizer, model: BaseEstimator):
+        self.vectorizer: CountVectorizer = vectorizer
+        self.model: BaseEstimator = model
+
+    def score_batch(self, texts: List[str]) -> List[ScoredMessage]:
+        features = self.vectorizer.transform(texts)
+        labels: np.ndarray = self.model.predict(features)
+        if hasattr(self.model, "decision_function"):
+            scores: np.ndarray = self.model.decision_function(features)
+        else:
+            # MultinomialNB has no decision_function, so use the probability of the positive (spam) class
+            scores = self.model.predict_proba(features)[:, list(self.model.classes_).index(True)]
+        return [(bool(label), float(score)) for label, score in zip(labels, scores)]
+
+
+class LatencyStats:
+    """
+    Per-request latencies (over a bounded window of recent requests) and overall throughput.
+    """
+
+    def __init__(self, window: int = 100_000):
+        self._latencies_ms: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._start: float = time.perf_counter()
+        self.num_requests: int = 0
+        self.num_batches: int = 0
+
+    def record_batch(self, latencies_ms: List[float]) -> None:
+        with self._lock:
+            self._latencies_ms.extend(latencies_ms)
+            self.num_requests += len(latencies_ms)
+            self.num_batches += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            latencies: np.ndarray = np.fromiter(self._latencies_ms, dtype=np.float64)
+            num_requests, num_batches = self.num_requests, self.num_batches
+        elapsed_s: float = time.perf_counter() - self._start
+        return {
+            "requests": num_requests,
+            "batches": num_batches,
+            "mean_batch_size": num_requests / num_batches if num_batches else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "throughput_per_s": num_requests / elapsed_s if elapsed_s > 0 else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects messages submitted from any thread into batches for a SpamScorer.
+    """
+
+    def __init__(self, scorer: SpamScorer, max_batch_size: int = 256, max_wait_ms: float = 5.0,
+                 stats: Optional[LatencyStats] = None):
+        self.scorer: SpamScorer = scorer
+        self.max_batch_size: int = max_batch_size
+        self.max_wait_s: float = max_wait_ms / 1000
+        self.stats: LatencyStats = stats or LatencyStats()
+        # each item is (message, time submitted, future to resolve). None tells the worker to stop
+        self._queue: "queue.Queue[Optional[Tuple[str, float, Future]]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> "Future[ScoredMessage]":
+        future: Future = Future()
+        self._queue.put((text, time.perf_counter(), future))
+        return future
+
+    def score(self, texts: List[str]) -> List[ScoredMessage]:
+        """
+        Blocking helper: submit every message, then wait for all of them. They may be batched with other callers'.
+        """
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self) -> None:
+        stopping: bool = False
+        while not stopping:
+            # block until there's at least one message, then wait at most max_wait_s for the batch to fill up
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline: float = time.perf_counter() + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                remaining: float = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(batch)
+
+    def _score(self, batch: List[Tuple[str, float, Future]]) -> None:
+        try:
+            results: List[ScoredMessage] = self.scorer.score_batch([text for text, _, _ in batch])
+        except Exception:
+            # one bad message (e.g. not a string) must not fail everyone else's: score them one at a time, so only the
+            # bad ones fail
+            self._score_one_by_one(batch)
+            return
+        done: float = time.perf_counter()
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+        self.stats.record_batch([(done - submitted) * 1000 for _, submitted, _ in batch])
+
+    def _score_one_by_one(self, batch: List[Tuple[str, float, Future]]) -> None:
+        latencies_ms: List[float] = []
+        for text, submitted, future in batch:
+            try:
+                result: ScoredMessage = self.scorer.score_batch([text])[0]
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            future.set_result(result)
+            latencies_ms.append((time.perf_counter() - submitted) * 1000)
+        if latencies_ms:
+            self.stats.record_batch(latencies_ms)
+
+
+def serve_http(batcher: MicroBatcher, host: str = "127.0.0.1", port: int = 8220) -> None:
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body: bytes = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self) -> None:
+            if self.path != "/score":
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts: List[str] = request["texts"]
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise TypeError("texts must be a list of strings")
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {"error": 'expected a JSON body like {"texts": ["..."]}'})
+                return
+            try:
+                results: List[ScoredMessage] = batcher.score(texts)
+            except Exception as e:
+                self._send_json(500, {"error": f"scoring failed: {type(e).__name__}: {e}"})
+                return
+            self._send_json(200, {"labels": [label for label, _ in results],
+                                  "scores": [score for _, score in results]})
+
+        def do_GET(self) -> None:
+            if self.path != "/stats":
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+                return
+            self._send_json(200, batcher.stats.snapshot())
+
+        def log_message(self, format: str, *args) -> None:
+            # the default handler logs every request to stderr, which costs more than scoring it
+            pass
+
+    # ThreadingHTTPServer handles each connection in its own thread, so concurrent requests land in the same batches
+    server = ThreadingHTTPServer((host, port), ScoringHandler)
+    print(f"Serving on http://{host}:{port} (POST /score, GET /stats)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def serve_stdio(batcher: MicroBatcher) -> None:
+    # a writer thread prints results in input order while the main thread keeps reading, so lines are batched
+    # together instead of each waiting for the previous one to finish
+    pending: "queue.Queue[Optional[Future]]" = queue.Queue()
+
+    def write_results() -> None:
+        while (future := pending.get()) is not None:
+            # one output line per input line, in order, even for a line that failed to score: an exception here
+            # would end this thread, and every later result would be silently dropped
+            try:
+                label, score = future.result()
+                output: Dict = {"label": label, "score": score}
+            except Exception as e:
+                output = {"error": f"scoring failed: {type(e).__name__}: {e}"}
+            sys.stdout.write(json.dumps(output) + "\n")
+            sys.stdout.flush()
+
+    writer = threading.Thread(target=write_results)
+    writer.start()
+    for line in sys.stdin:
+        pending.put(batcher.submit(line.rstrip("\n")))
+    pending.put(None)
+    writer.join()
+    print(json.dumps(batcher.stats.snapshot()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import tempfile
+
+    from artifact_cache import ArtifactCache, fit_or_load
+
+    parser = argparse.ArgumentParser(description="Micro-batched spam scoring service")
+    parser.add_argument("--tsv", required=True, help="path to SMSSpamCollection.tsv")
+    parser.add_argument("--model", choices=["svm", "nb"], default="svm")
+    parser.add_argument("--mode", choices=["http", "stdio"], default="http")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8220)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with open(args.tsv, "rb") as f:
+        tsv_bytes: bytes = f.read()
+    # re-use fitted models across restarts, see artifact_cache.py
+    cache = ArtifactCache(os.path.join(tempfile.gettempdir(), "nlp220_ca1_cache"))
+    artifacts = fit_or_load(cache, tsv_bytes)
+
+    batcher = MicroBatcher(SpamScorer(artifacts.vectorizer, artifacts.models[args.model]),
+                           max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        if args.mode == "http":
+            serve_http(batcher, host=args.host, port=args.port)
+        else:
+            serve_stdio(batcher)
+    finally:
+        batcher.close()
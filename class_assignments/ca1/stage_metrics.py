@@ -0,0 +1,302 @@
+"""
+Stage-level instrumentation for the text-classification pipeline in my_ca1.py.
+
+my_ca1.py has four stages (load, split, featurize, train/evaluate), each wrapped in metrics.stage(...) (a function can
+also be decorated with @metrics.instrument(...)) to record, per stage:
+- wall time and CPU time (CPU much lower than wall means we're waiting on I/O or the network)
+- peak memory delta (with track_memory=True): the most memory (allocated from Python, via tracemalloc) held during the
+  stage, above what was held when it started. Off by default: tracemalloc hooks every allocation, which can make
+  allocation-heavy stages (like CountVectorizer) several times slower, so times measured with it on are inflated
+- any counts you attach, e.g. rows, vocabulary size, nnz of the feature matrix, and scores, e.g. accuracy and F1
+
+Stages can be nested (e.g. a stage per model inside train_evaluate): each one reports its own times and peak memory.
+
+Metrics can be exported as structured (JSON) log lines, or as a Prometheus text-format file (e.g. for node_exporter's
+textfile collector). One stage at a time can also be profiled: with cProfile (profile="cprofile", writes a .prof file
+for pstats/snakeviz), or with a sampling profiler (profile="sample", writes collapsed stacks, the same format as
+`py-spy record --format raw`, which flamegraph.pl and speedscope read).
+
+Scripts like my_ca1.py take no arguments, so PipelineMetrics.from_env reads these settings from environment variables
+(STAGE_METRICS_TRACK_MEMORY, STAGE_METRICS_PROFILE_STAGE, STAGE_METRICS_PROFILE_MODE, STAGE_METRICS_PROFILE_DIR,
+STAGE_METRICS_PROMETHEUS).
+Running this file sets them from command-line flags, then runs my_ca1.py.
+
+> metrics = PipelineMetrics("spam_pipeline")
+> with metrics.stage("featurize") as stage:
+>     X_train_feat = vectorizer.fit_transform(X_train)
+>     stage.record(vocab_size=len(vectorizer.vocabulary_), nnz=X_train_feat.nnz)
+> with metrics.stage("train_evaluate") as stage:
+>     ...
+>     stage.record_score(svm_accuracy=accuracy_score(y_test, y_pred))
+> metrics.write_prometheus("spam_pipeline.prom")
+"""
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_mem_delta_bytes: Optional[int] = None
+    counts: Dict[str, float] = field(default_factory=dict)
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    def record(self, **counts: float) -> None:
+        """
+        Attach counts to this stage, e.g. stage.record(rows=len(df), vocab_size=len(vectorizer.vocabulary_))
+        """
+        self.counts.update(counts)
+
+    def record_score(self, **scores: float) -> None:
+        """
+        Attach model scores to this stage, e.g. stage.record_score(svm_accuracy=0.98, svm_f1=0.93). Kept apart from
+        counts, so they're exported as their own metric.
+        """
+        self.scores.update(scores)
+
+
+class StackSampler:
+    """
+    A minimal sampling profiler: a background thread records the target thread's stack every interval_s seconds.
+    Much lower overhead than cProfile on hot loops, at the cost of only being statistically accurate.
+    """
+
+    def __init__(self, interval_s: float = 0.005, thread_id: Optional[int] = None):
+        self.interval_s: float = interval_s
+        self.thread_id: int = thread_id or threading.get_ident()
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            frames: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if frames:
+                # collapsed stack format: root;...;leaf
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _escape_label_value(value: str) -> str:
+    # the Prometheus text format's escapes for label values: backslash, double quote and newline
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PipelineMetrics:
+
+    def __init__(self, pipeline: str, track_memory: bool = False, profile_dir: str = ".",
+                 profile_stage: Optional[str] = None, profile_mode: str = "cprofile",
+                 prometheus_path: Optional[str] = None):
+        """
+        :param track_memory: record each stage's peak memory delta with tracemalloc. This slows down every allocation
+            while any stage is open, so only turn it on for runs you're not taking timings from
+        :param profile_stage: the name of a stage to profile (with profile_mode) when stage() isn't given a profile
+        :param prometheus_path: where export() writes the Prometheus file, if anywhere
+        """
+        self.pipeline: str = pipeline
+        self.track_memory: bool = track_memory
+        self.profile_dir: str = profile_dir
+        self.profile_stage: Optional[str] = profile_stage
+        self.profile_mode: str = profile_mode
+        self.prometheus_path: Optional[str] = prometheus_path
+        self.stages: List[StageMetrics] = []
+        # for each open stage (outermost first): the highest tracemalloc peak seen before a nested stage reset it
+        self._saved_peaks: List[int] = []
+
+    @contextmanager
+    def stage(self, name: str, profile: Optional[str] = None) -> Iterator[StageMetrics]:
+        """
+        Measure the code in the with block as one stage.
+
+        :param profile: None, "cprofile" or "sample". Profiles only this stage, writing
+            <profile_dir>/<pipeline>.<name>.prof (cprofile) or .collapsed (sample). Defaults to profile_mode if this
+            is the profile_stage
+        """
+        if profile is None and name == self.profile_stage:
+            profile = self.profile_mode
+        metrics = StageMetrics(name=name)
+        started_tracing: bool = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            start_mem, peak_so_far = tracemalloc.get_traced_memory()
+            if self._saved_peaks:
+                # we're nested: reset_peak below would lose the enclosing stage's peak so far, so save it first
+                self._saved_peaks[-1] = max(self._saved_peaks[-1], peak_so_far)
+            tracemalloc.reset_peak()
+            self._saved_peaks.append(0)
+        profiler: Optional[cProfile.Profile] = cProfile.Profile() if profile == "cprofile" else None
+        sampler: Optional[StackSampler] = StackSampler() if profile == "sample" else None
+        if profile not in (None, "cprofile", "sample"):
+            raise ValueError(f"unknown profile mode: {profile}")
+
+        wall_start: float = time.perf_counter()
+        cpu_start: float = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        if sampler is not None:
+            sampler.start()
+        try:
+            yield metrics
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+            metrics.wall_s = time.perf_counter() - wall_start
+            metrics.cpu_s = time.process_time() - cpu_start
+            if self.track_memory:
+                _, peak_mem = tracemalloc.get_traced_memory()
+                peak_mem = max(peak_mem, self._saved_peaks.pop())
+                metrics.peak_mem_delta_bytes = peak_mem - start_mem
+                if self._saved_peaks:
+                    # this stage's peak is also part of the enclosing stage's
+                    self._saved_peaks[-1] = max(self._saved_peaks[-1], peak_mem)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profiler is not None:
+                profiler.dump_stats(self._profile_path(name, "prof"))
+            if sampler is not None:
+                sampler.write_collapsed(self._profile_path(name, "collapsed"))
+            self.stages.append(metrics)
+            logger.info(json.dumps({"pipeline": self.pipeline, **asdict(metrics)}))
+
+    def instrument(self, name: Optional[str] = None, profile: Optional[str] = None) -> Callable:
+        """
+        Decorator version of stage(). The stage is named after the function unless name is given.
+        """
+        def decorator(function: Callable) -> Callable:
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or function.__name__, profile=profile):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _profile_path(self, stage_name: str, extension: str) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        return os.path.join(self.profile_dir, f"{self.pipeline}.{stage_name}.{extension}")
+
+    def to_json_lines(self) -> str:
+        return "".join(json.dumps({"pipeline": self.pipeline, **asdict(stage)}) + "\n" for stage in self.stages)
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition format, one gauge per metric, labelled by pipeline and stage.
+        """
+        lines: List[str] = []
+
+        def gauge(metric: str, help_text: str, values: List[tuple]) -> None:
+            if not values:
+                return
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for labels, value in values:
+                label_text: str = ",".join(f'{key}="{_escape_label_value(str(value_))}"'
+                                           for key, value_ in labels.items())
+                lines.append(f"{metric}{{{label_text}}} {value}")
+
+        def labels(stage: StageMetrics, **extra: str) -> Dict[str, str]:
+            return {"pipeline": self.pipeline, "stage": stage.name, **extra}
+
+        gauge("pipeline_stage_wall_seconds", "Wall-clock time of the stage.",
+              [(labels(stage), stage.wall_s) for stage in self.stages])
+        gauge("pipeline_stage_cpu_seconds", "CPU time of this process during the stage.",
+              [(labels(stage), stage.cpu_s) for stage in self.stages])
+        gauge("pipeline_stage_peak_memory_delta_bytes", "Peak Python-allocated memory during the stage, above its start.",
+              [(labels(stage), stage.peak_mem_delta_bytes) for stage in self.stages
+               if stage.peak_mem_delta_bytes is not None])
+        gauge("pipeline_stage_count", "Row/feature counts recorded by the stage.",
+              [(labels(stage, name=name), value) for stage in self.stages for name, value in stage.counts.items()])
+        gauge("pipeline_stage_score", "Model scores (e.g. accuracy, F1) recorded by the stage.",
+              [(labels(stage, name=name), value) for stage in self.stages for name, value in stage.scores.items()])
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_env(cls, pipeline: str) -> "PipelineMetrics":
+        """
+        A PipelineMetrics configured from STAGE_METRICS_* environment variables (see the module docstring).
+        """
+        return cls(pipeline, track_memory=os.environ.get("STAGE_METRICS_TRACK_MEMORY", "0").lower() in ("1", "true"),
+                   profile_dir=os.environ.get("STAGE_METRICS_PROFILE_DIR", "."),
+                   profile_stage=os.environ.get("STAGE_METRICS_PROFILE_STAGE") or None,
+                   profile_mode=os.environ.get("STAGE_METRICS_PROFILE_MODE", "cprofile"),
+                   prometheus_path=os.environ.get("STAGE_METRICS_PROMETHEUS") or None)
+
+    def summary(self) -> str:
+        """
+        One line per stage: wall and CPU time, peak memory delta (if tracked) and counts.
+        """
+        lines: List[str] = []
+        for stage in self.stages:
+            memory: str = f"  peak +{stage.peak_mem_delta_bytes / 2 ** 20:.1f}MB" \
+                if stage.peak_mem_delta_bytes is not None else ""
+            counts: str = "".join(f"  {name}={value:g}" for name, value in stage.counts.items())
+            lines.append(f"{stage.name:<16} wall {stage.wall_s:7.3f}s  cpu {stage.cpu_s:7.3f}s{memory}{counts}")
+        return "\n".join(lines)
+
+    def export(self) -> None:
+        """
+        Write the Prometheus file to prometheus_path, if one was configured.
+        """
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+    def write_prometheus(self, path: str) -> None:
+        # write + rename, so a collector never scrapes a half-written file
+        tmp_path: str = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    import argparse
+    import runpy
+
+    parser = argparse.ArgumentParser(description="Run my_ca1.py with per-stage metrics")
+    parser.add_argument("--profile-stage", default=None, help="name of one stage to profile")
+    parser.add_argument("--profile-mode", choices=["cprofile", "sample"], default="cprofile")
+    parser.add_argument("--prometheus", default=None, help="also write metrics to this .prom file")
+    parser.add_argument("--track-memory", action="store_true", help="record peak memory (slows every stage down)")
+    args = parser.parse_args()
+
+    # my_ca1.py builds its PipelineMetrics with from_env, so pass the flags on as environment variables
+    os.environ["STAGE_METRICS_TRACK_MEMORY"] = "1" if args.track_memory else "0"
+    os.environ["STAGE_METRICS_PROFILE_STAGE"] = args.profile_stage or ""
+    os.environ["STAGE_METRICS_PROFILE_MODE"] = args.profile_mode
+    os.environ["STAGE_METRICS_PROMETHEUS"] = args.prometheus or ""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "my_ca1.py"), run_name="__main__")
@@ -0,0 +1,210 @@
+"""
+One place to fetch the datasets used across these examples, with a local cache and an offline mode.
+
+Each script used to fetch its own data: number_1.py with requests.get(...).content, number_4.py by downloading and
+extracting iris.zip, my_ca1.py by passing a URL to read_csv (so it downloads on every run), and nltk.download(...) calls
+that check the network on every start. Instead:
+
+- DATASETS is a registry: name -> where to download it, its sha256 checksum, and (optionally) a copy vendored in this repo
+- fetch(name) returns a local path, in this order: a verified copy in the cache, a verified vendored copy, and only then
+  a download. Downloads are streamed to disk in chunks (never the whole body in memory), checked against the checksum,
+  and atomically renamed into place, so an interrupted download never leaves a partial file in the cache
+- open_zip_member(name, member) reads a file straight out of a zip dataset, without extracting it to disk
+- ensure_nltk(package) only calls nltk.download if the resource isn't already installed
+
+Offline mode (offline=True, or the environment variable NLP220_OFFLINE=1) never touches the network: if the data isn't
+already cached or vendored, fetch raises instead.
+
+> path: str = fetch("who_life_expectancy")
+> iris_df = pd.read_csv(open_zip_member("iris", "iris.data"), names=[...])
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import IO, Dict, Optional
+
+REPO_ROOT: str = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR: str = os.environ.get("NLP220_DATA_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "nlp220"))
+DOWNLOAD_CHUNK_SIZE: int = 1 << 20
+
+
+def offline_mode() -> bool:
+    return os.environ.get("NLP220_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+
+class OfflineError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    url: str
+    file_name: str
+    # None means trust on first use: the checksum of the first download is recorded, and later copies must match it
+    sha256: Optional[str] = None
+    # relative to the root of this repo
+    vendored_path: Optional[str] = None
+
+
+DATASETS: Dict[str, DatasetSpec] = {
+    "who_life_expectancy": DatasetSpec(
+        url="https://raw.githubusercontent.com/jackiekazil/data-wrangling/master/data/chp3/data-text.csv",
+        file_name="number-1-data-text.csv",
+        sha256="e8e49d291fd727203a3ff11f731cdb6d02d670755c139a04b45b4bd916529a65",
+        vendored_path="practice_not_graded/number-1-data-text.csv"),
+    "iris": DatasetSpec(
+        url="https://archive.ics.uci.edu/static/public/53/iris.zip",
+        file_name="iris.zip",
+        sha256="d11fe30213d36434a0879aab7cb00ce3c812eb7ba2495874438abff7b7b762e9",
+        vendored_path="practice_not_graded/iris.zip"),
+    "sms_spam": DatasetSpec(
+        url="https://raw.githubusercontent.com/kingb12/nlp220_section_examples/main/SMSSpamCollection.tsv",
+        file_name="SMSSpamCollection.tsv"),
+}
+
+
+def sha256_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class _Manifest:
+    """
+    Remembers which files we've already checksummed (by size + modification time), so a cold start doesn't re-hash
+    every file, and the checksums recorded for trust-on-first-use datasets.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.path: str = os.path.join(cache_dir, "manifest.json")
+        try:
+            with open(self.path, "r") as f:
+                self.entries: Dict[str, Dict] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path: str = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def verify(self, path: str, name: str, expected_sha256: Optional[str]) -> bool:
+        expected_sha256 = expected_sha256 or self.entries.get(name, {}).get("sha256")
+        stat = os.stat(path)
+        seen: Dict = self.entries.get(f"verified:{path}", {})
+        if seen.get("size") == stat.st_size and seen.get("mtime_ns") == stat.st_mtime_ns:
+            actual: str = seen["sha256"]
+        else:
+            actual = sha256_file(path)
+            self.entries[f"verified:{path}"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": actual}
+            self.save()
+        if expected_sha256 is None:
+            # trust on first use
+            self.entries[name] = {"sha256": actual}
+            self.save()
+            return True
+        return actual == expected_sha256
+
+
+def _download(url: str, destination: str, expected_sha256: Optional[str]) -> str:
+    import requests
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination), prefix=".download-")
+    try:
+        with os.fdopen(fd, "wb") as f, requests.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                f.write(chunk)
+        actual: str = hasher.hexdigest()
+        if expected_sha256 is not None and actual != expected_sha256:
+            raise ValueError(f"checksum mismatch for {url}: expected {expected_sha256}, got {actual}")
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return actual
+
+
+def fetch(name: str, offline: Optional[bool] = None, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Return a local path to the named dataset, downloading it only if no verified local copy exists.
+    """
+    spec: DatasetSpec = DATASETS[name]
+    offline = offline_mode() if offline is None else offline
+    manifest = _Manifest(cache_dir)
+
+    cached_path: str = os.path.join(cache_dir, name, spec.file_name)
+    if os.path.exists(cached_path) and manifest.verify(cached_path, name, spec.sha256):
+        return cached_path
+    if spec.vendored_path is not None:
+        vendored_path: str = os.path.join(REPO_ROOT, spec.vendored_path)
+        if os.path.exists(vendored_path) and manifest.verify(vendored_path, name, spec.sha256):
+            return vendored_path
+    if offline:
+        raise OfflineError(f"{name} is not cached in {cache_dir} or vendored in the repo, and offline mode is on")
+
+    print(f"Downloading {spec.url} to {cached_path}...")
+    actual_sha256: str = _download(spec.url, cached_path, spec.sha256 or manifest.entries.get(name, {}).get("sha256"))
+    if spec.sha256 is None:
+        manifest.entries[name] = {"sha256": actual_sha256}
+        manifest.save()
+    return cached_path
+
+
+def open_zip_member(name: str, member: str, offline: Optional[bool] = None, cache_dir: str = CACHE_DIR) -> IO[bytes]:
+    """
+    Open one file inside a zip dataset for reading, without extracting anything to disk. The result is a binary
+    file-like object, which e.g. pd.read_csv accepts directly.
+    """
+    import io
+
+    with zipfile.ZipFile(fetch(name, offline=offline, cache_dir=cache_dir), "r") as zip_ref:
+        # small members (like iris.data) are just read into memory, so the zip file can be closed right away
+        return io.BytesIO(zip_ref.read(member))
+
+
+def ensure_nltk(package: str, resource_path: Optional[str] = None, offline: Optional[bool] = None) -> None:
+    """
+    nltk.download(package), but only if it isn't already installed. nltk.download checks the remote index every
+    time, even when the resource is up to date, which is what makes it slow (or hang) on start-up.
+
+    :param package: the name passed to nltk.download, e.g. 'twitter_samples'
+    :param resource_path: the path nltk.data.find looks for, e.g. 'corpora/twitter_samples'. We try the usual
+        locations (corpora/, taggers/, tokenizers/, ...) if not given
+    """
+    import nltk
+
+    candidates = [resource_path] if resource_path else \
+        [f"{kind}/{package}" for kind in ("corpora", "taggers", "tokenizers", "help", "models")]
+    for candidate in candidates:
+        for suffix in ("", ".zip"):
+            try:
+                nltk.data.find(candidate + suffix)
+                return
+            except LookupError:
+                pass
+    if offline_mode() if offline is None else offline:
+        raise OfflineError(f"NLTK resource {package} is not installed, and offline mode is on")
+    nltk.download(package)
+
+
+if __name__ == '__main__':
+    import sys
+
+    # e.g. python data_registry.py who_life_expectancy iris
+    for dataset_name in sys.argv[1:] or DATASETS:
+        try:
+            print(f"{dataset_name}: {fetch(dataset_name)}")
+        except OfflineError as e:
+            print(f"{dataset_name}: {e}")
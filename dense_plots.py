@@ -0,0 +1,288 @@
+"""
+Scatter plots that stay fast at millions of points: above a point-count threshold, points are binned with NumPy and
+drawn as a density raster (or hexbin) instead of one marker each.
+
+plt.scatter draws (and a PNG/SVG stores) every point, so rendering time and file size grow with the data, and past a
+few hundred thousand points the plot is a solid blob anyway. Binned, a plot costs the same to draw and save no matter
+how many points went into it, and shows where the points actually are:
+- density_scatter(x, y) works like plt.scatter, and like plt.scatter it can be passed to FacetGrid.map. At or below
+  threshold points it IS plt.scatter, so small plots (like iris) look exactly as before
+- bins are cached (BinCache), keyed by a hash of the data and the binning params, so re-styling a plot (colors, titles,
+  log scale) doesn't re-bin
+- prebin_facets(df, ...) bins every facet in parallel threads (NumPy releases the GIL for the heavy parts) and fills
+  the cache, so the FacetGrid.map that follows only draws. Drawing itself stays in the main thread: matplotlib figures
+  aren't thread-safe
+
+For facets to be comparable, bin them all over the same extent (data_extent of the whole frame), and color them all on
+the same scale (vmax = max_count of every facet's bins). Points outside the extent are dropped, as ax.hexbin does.
+
+> cache = BinCache()
+> extent = data_extent(df["sepal_length"], df["sepal_width"])
+> facet_bins = prebin_facets(df, "sepal_length", "sepal_width", col="species", extent=extent, cache=cache)
+> g = sns.FacetGrid(df, col="species")
+> g.map(density_scatter, "sepal_length", "sepal_width", extent=extent, cache=cache, vmax=max_count(facet_bins.values()))
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.axes import Axes
+from matplotlib.colors import LinearSegmentedColormap, LogNorm
+
+# above this many points, density_scatter bins instead of drawing markers
+AGGREGATE_THRESHOLD: int = 50_000
+
+# part of every BinCache key: bump it when binning changes, so bins cached on disk by older code aren't re-used
+BIN_VERSION: int = 2
+
+# (xmin, xmax, ymin, ymax), the same order as imshow's and hexbin's extent
+Extent = Tuple[float, float, float, float]
+
+
+@dataclass
+class BinnedPoints:
+    """
+    mode="raster": counts is (gridsize, gridsize), x and y are the bin edges.
+    mode="hexbin": counts is 1D, one per non-empty hexagon, and x and y are the hexagon centers.
+    """
+    mode: str
+    counts: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    extent: Extent
+    gridsize: int
+    num_points: int
+
+
+def data_extent(x: Sequence[float], y: Sequence[float]) -> Extent:
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    xmin, xmax, ymin, ymax = float(np.nanmin(x)), float(np.nanmax(x)), float(np.nanmin(y)), float(np.nanmax(y))
+    # a single value would give zero-width bins
+    if xmin == xmax:
+        xmin, xmax = xmin - 0.5, xmax + 0.5
+    if ymin == ymax:
+        ymin, ymax = ymin - 0.5, ymax + 0.5
+    return xmin, xmax, ymin, ymax
+
+
+def _hex_bin(x: np.ndarray, y: np.ndarray, gridsize: int, extent: Extent) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The same hexagonal grid as ax.hexbin(gridsize=gridsize, extent=extent): two offset rectangular lattices, each point
+    goes to the nearer of its two candidate centers. Returns (center x, center y, count) for non-empty hexagons.
+    """
+    xmin, xmax, ymin, ymax = extent
+    nx: int = gridsize
+    ny: int = int(nx / np.sqrt(3))
+    # ax.hexbin pads x by a tiny fraction, so a point at exactly xmax doesn't round off the grid
+    padding: float = 1e-9 * (xmax - xmin)
+    xmin, xmax = xmin - padding, xmax + padding
+    sx: float = (xmax - xmin) / nx
+    sy: float = (ymax - ymin) / ny
+    ix: np.ndarray = (x - xmin) / sx
+    iy: np.ndarray = (y - ymin) / sy
+    ix1, iy1 = np.round(ix), np.round(iy)
+    ix2, iy2 = np.floor(ix), np.floor(iy)
+    on_first: np.ndarray = (ix - ix1) ** 2 + 3 * (iy - iy1) ** 2 < (ix - ix2 - 0.5) ** 2 + 3 * (iy - iy2 - 0.5) ** 2
+    center_x: np.ndarray = np.where(on_first, ix1, ix2 + 0.5)
+    center_y: np.ndarray = np.where(on_first, iy1, iy2 + 0.5)
+    # like ax.hexbin, drop points whose hexagon is off the grid (i.e. outside extent). Kept, they'd get cell ids that
+    # wrap around into other rows of the grid below
+    inside: np.ndarray = (center_x >= 0) & (center_x <= nx) & (center_y >= 0) & (center_y <= ny)
+    center_x, center_y = center_x[inside], center_y[inside]
+    # center coordinates are multiples of 0.5, so doubling them gives exact integer cell ids to count with
+    width: int = 2 * nx + 3
+    cell: np.ndarray = (2 * center_y).astype(np.int64) * width + (2 * center_x).astype(np.int64)
+    cells, counts = np.unique(cell, return_counts=True)
+    return xmin + (cells % width) / 2 * sx, ymin + (cells // width) / 2 * sy, counts
+
+
+def bin_points(x: Sequence[float], y: Sequence[float], mode: str = "raster", gridsize: int = 200,
+               extent: Optional[Extent] = None) -> BinnedPoints:
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    keep: np.ndarray = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    extent = extent or data_extent(x, y)
+    if mode == "raster":
+        counts, x_edges, y_edges = np.histogram2d(x, y, bins=gridsize, range=[extent[:2], extent[2:]])
+        return BinnedPoints(mode, counts, x_edges, y_edges, extent, gridsize, len(x))
+    if mode == "hexbin":
+        centers_x, centers_y, counts = _hex_bin(x, y, gridsize, extent)
+        return BinnedPoints(mode, counts, centers_x, centers_y, extent, gridsize, len(x))
+    raise ValueError(f"unknown mode: {mode}")
+
+
+class BinCache:
+    """
+    BinnedPoints keyed by a hash of the data and the binning params. In memory, and also in directory (as .npz files)
+    if one is given, so re-running a plotting script with new styling doesn't re-bin either.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory: Optional[str] = os.path.expanduser(directory) if directory else None
+        self._entries: Dict[str, BinnedPoints] = {}
+
+    @staticmethod
+    def key(x: np.ndarray, y: np.ndarray, mode: str, gridsize: int, extent: Optional[Extent]) -> str:
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(np.ascontiguousarray(x, dtype=np.float64).tobytes())
+        hasher.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+        hasher.update(repr((BIN_VERSION, len(x), mode, gridsize, extent)).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get_or_bin(self, x: Sequence[float], y: Sequence[float], mode: str = "raster", gridsize: int = 200,
+                   extent: Optional[Extent] = None) -> BinnedPoints:
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        key: str = self.key(x, y, mode, gridsize, extent)
+        if key in self._entries:
+            return self._entries[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as stored:
+                binned = BinnedPoints(mode, stored["counts"], stored["x"], stored["y"],
+                                      tuple(float(value) for value in stored["extent"]), gridsize,
+                                      int(stored["num_points"]))
+        else:
+            binned = bin_points(x, y, mode=mode, gridsize=gridsize, extent=extent)
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                # write + rename, so a crash mid-write never leaves a truncated entry behind
+                tmp_path: str = self._path(key) + ".tmp.npz"
+                np.savez(tmp_path, counts=binned.counts, x=binned.x, y=binned.y, extent=np.array(binned.extent),
+                         num_points=binned.num_points)
+                os.replace(tmp_path, self._path(key))
+        self._entries[key] = binned
+        return binned
+
+
+def max_count(binned: Iterable[BinnedPoints]) -> float:
+    """
+    The largest bin count across several BinnedPoints (e.g. prebin_facets(...).values()), to pass as vmax so every
+    facet is colored on the same scale.
+    """
+    return float(max((points.counts.max(initial=0) for points in binned), default=0))
+
+
+def draw_binned(binned: BinnedPoints, ax: Optional[Axes] = None, color: Optional[str] = None, cmap: str = "viridis",
+                log: bool = True, label: Optional[str] = None, vmax: Optional[float] = None):
+    """
+    Draw pre-binned points. With color (e.g. from FacetGrid's hue), the colormap goes from white to that color, so
+    per-facet colors still read as the same categories as in a scatter plot.
+
+    :param vmax: the count drawn at full color. Defaults to this plot's own largest count, so pass the same vmax (see
+        max_count) to plots that should be compared
+    """
+    ax = ax or plt.gca()
+    colormap = LinearSegmentedColormap.from_list("density", ["white", color]) if color is not None else cmap
+    vmax = vmax if vmax is not None else float(binned.counts.max(initial=0))
+    # log: a few dense clusters would otherwise wash out everything else
+    norm = LogNorm(vmin=1, vmax=vmax) if log and vmax > 1 else None
+    if binned.mode == "raster":
+        # histogram2d's counts are indexed [x, y], imshow's [row, column] = [y, x], hence the transpose
+        counts: np.ndarray = np.ma.masked_equal(binned.counts.T, 0)
+        return ax.imshow(counts, origin="lower", extent=binned.extent, aspect="auto", interpolation="nearest",
+                         cmap=colormap, norm=norm, vmax=None if norm is not None else vmax, label=label)
+    # re-bin only the hexagon centers (a few thousand points at most), each weighted by its count: every center lands
+    # exactly in its own hexagon, so this draws the same plot as ax.hexbin over all the points
+    return ax.hexbin(binned.x, binned.y, C=binned.counts, reduce_C_function=np.sum, gridsize=binned.gridsize,
+                     extent=binned.extent, cmap=colormap, norm=norm, vmax=None if norm is not None else vmax, mincnt=1,
+                     label=label)
+
+
+def density_scatter(x: Sequence[float], y: Sequence[float], threshold: int = AGGREGATE_THRESHOLD, mode: str = "raster",
+                    gridsize: int = 200, extent: Optional[Extent] = None, cache: Optional[BinCache] = None,
+                    ax: Optional[Axes] = None, color: Optional[str] = None, label: Optional[str] = None,
+                    log: bool = True, vmax: Optional[float] = None, **scatter_kwargs):
+    """
+    plt.scatter(x, y) for up to threshold points, a binned density plot (see draw_binned) above that. Can be passed to
+    FacetGrid.map, like plt.scatter.
+
+    :param mode: "raster" (rectangular bins, drawn with imshow) or "hexbin"
+    :param gridsize: number of bins along x
+    :param extent: (xmin, xmax, ymin, ymax) to bin over, defaults to the data's. Pass the same one to every facet
+    :param cache: a BinCache to re-use bins from, or None to always bin
+    :param vmax: the bin count drawn at full color (see draw_binned). Pass the same one to every facet
+    """
+    ax = ax or plt.gca()
+    if len(x) <= threshold:
+        return ax.scatter(x, y, color=color, label=label, **scatter_kwargs)
+    binned: BinnedPoints = (cache.get_or_bin(x, y, mode=mode, gridsize=gridsize, extent=extent) if cache is not None
+                            else bin_points(x, y, mode=mode, gridsize=gridsize, extent=extent))
+    return draw_binned(binned, ax=ax, color=color, log=log, label=label, vmax=vmax)
+
+
+def prebin_facets(df: pd.DataFrame, x: str, y: str, col: str, threshold: int = AGGREGATE_THRESHOLD,
+                  mode: str = "raster", gridsize: int = 200, extent: Optional[Extent] = None,
+                  cache: Optional[BinCache] = None, num_workers: Optional[int] = None) -> Dict[Hashable, BinnedPoints]:
+    """
+    Bin every facet (df grouped by col) with more than threshold points, in parallel, into cache. A FacetGrid.map of
+    density_scatter with the same params then finds every facet's bins in the cache. max_count of the returned bins is
+    the vmax that puts every facet on the same color scale.
+    """
+    cache = cache if cache is not None else BinCache()
+    facets = [(name, facet) for name, facet in df.groupby(col, observed=True, sort=False) if len(facet) > threshold]
+    with ThreadPoolExecutor(max_workers=num_workers or os.cpu_count()) as executor:
+        binned = executor.map(lambda item: cache.get_or_bin(item[1][x].to_numpy(), item[1][y].to_numpy(), mode=mode,
+                                                            gridsize=gridsize, extent=extent), facets)
+        return {name: result for (name, _), result in zip(facets, binned)}
+
+
+def _check_against_hexbin(x: np.ndarray, y: np.ndarray, gridsize: int, extent: Extent) -> None:
+    """
+    _hex_bin must give the same (center, count) pairs as ax.hexbin, including for points outside extent.
+    """
+    fig, ax = plt.subplots()
+    expected = ax.hexbin(x, y, gridsize=gridsize, extent=extent, mincnt=1)
+    plt.close(fig)
+    # compare hexagons by (doubled) lattice position, not by float center, so roundoff can't cause a mismatch
+    ny: int = int(gridsize / np.sqrt(3))
+
+    def cells(centers_x: np.ndarray, centers_y: np.ndarray) -> np.ndarray:
+        return np.rint(np.column_stack([(centers_x - extent[0]) / (extent[1] - extent[0]) * gridsize * 2,
+                                        (centers_y - extent[2]) / (extent[3] - extent[2]) * ny * 2])).astype(np.int64)
+
+    offsets: np.ndarray = np.asarray(expected.get_offsets())
+    expected_counts: Dict[Tuple[int, int], int] = {
+        tuple(cell): int(count) for cell, count in zip(cells(offsets[:, 0], offsets[:, 1]), expected.get_array())}
+    centers_x, centers_y, counts = _hex_bin(x, y, gridsize, extent)
+    actual_counts: Dict[Tuple[int, int], int] = {
+        tuple(cell): int(count) for cell, count in zip(cells(centers_x, centers_y), counts)}
+    assert actual_counts == expected_counts, "_hex_bin doesn't match ax.hexbin"
+
+
+if __name__ == '__main__':
+    import time
+
+    # 3 clusters of 1M points each, plotted both ways
+    rng = np.random.default_rng(0)
+    big: pd.DataFrame = pd.concat([pd.DataFrame({"x": rng.normal(center, 1.0, 1_000_000),
+                                                 "y": rng.normal(center / 2, 0.5, 1_000_000), "facet": name})
+                                   for name, center in (("a", 0.0), ("b", 3.0), ("c", 6.0))], ignore_index=True)
+
+    # the hexagons must match ax.hexbin's, over the whole data and over an extent that cuts off most of it
+    sample: pd.DataFrame = big.sample(n=100_000, random_state=0)
+    _check_against_hexbin(sample["x"].to_numpy(), sample["y"].to_numpy(), 50, data_extent(sample["x"], sample["y"]))
+    _check_against_hexbin(sample["x"].to_numpy(), sample["y"].to_numpy(), 50, (1.0, 4.0, 0.5, 2.0))
+
+    bin_cache = BinCache()
+    shared_extent: Extent = data_extent(big["x"], big["y"])
+    for plot_mode in ("raster", "hexbin"):
+        start: float = time.perf_counter()
+        facet_bins = prebin_facets(big, "x", "y", col="facet", mode=plot_mode, extent=shared_extent, cache=bin_cache)
+        binned_s: float = time.perf_counter() - start
+        start = time.perf_counter()
+        fig, axes = plt.subplots(1, 3, figsize=(12, 4), sharex=True, sharey=True)
+        for axis, (facet_name, facet_df) in zip(axes, big.groupby("facet")):
+            density_scatter(facet_df["x"], facet_df["y"], mode=plot_mode, extent=shared_extent, cache=bin_cache,
+                            ax=axis, vmax=max_count(facet_bins.values()))
+            axis.set_title(facet_name)
+        fig.savefig(f"dense_plots_{plot_mode}.png")
+        plt.close(fig)
+        print(f"{plot_mode}: binned 3 facets in {binned_s:.2f}s, drew + saved (from cache) in "
+              f"{time.perf_counter() - start:.2f}s")
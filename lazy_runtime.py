@@ -0,0 +1,155 @@
+"""
+Lazy imports and cached model loading, so short scripts don't pay for spaCy/NLTK/sklearn/seaborn before they need them.
+
+Importing spacy, nltk, sklearn or seaborn takes anywhere from a few hundred milliseconds to seconds each, and loading a
+spaCy model or the NLTK perceptron tagger takes longer still. For a short-lived job, that can be most of its run time.
+
+- lazy_import("seaborn") returns a stand-in module: the real import only happens on first attribute access (e.g.
+  sns.FacetGrid), and never if the code path that uses it doesn't run
+- get_spacy_pipeline(...) and get_perceptron_tagger() load a model on first use, and return the same object after that
+  (one per process)
+- ensure_nltk (from data_registry.py) only downloads NLTK resources that aren't already installed, and
+  ensure_pos_tagging_resources() does that for everything POS tagging needs, under this NLTK version's resource names
+- import_profile() reports how many milliseconds each import (and model load) done through this module took, so
+  start-up regressions are easy to spot
+
+> sns = lazy_import("seaborn")
+> nlp = get_spacy_pipeline("en_core_web_sm", disable=("ner", "parser"))
+> print_import_profile()
+"""
+import importlib
+import sys
+import threading
+import time
+from functools import lru_cache
+from types import ModuleType
+from typing import Any, Dict, Tuple
+
+from data_registry import ensure_nltk
+
+# name -> milliseconds, for everything imported or loaded through this module
+_profile_ms: Dict[str, float] = {}
+_profile_lock = threading.Lock()
+
+
+def _record(name: str, start: float) -> None:
+    with _profile_lock:
+        _profile_ms[name] = _profile_ms.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def timed_import(name: str) -> ModuleType:
+    """
+    importlib.import_module, recording how long it took. Already-imported modules are returned without being counted.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    start: float = time.perf_counter()
+    module: ModuleType = importlib.import_module(name)
+    _record(name, start)
+    return module
+
+
+class LazyModule(ModuleType):
+    """
+    Stands in for a module until one of its attributes is used, then imports it for real.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_module = None
+
+    def _load(self) -> ModuleType:
+        if self._lazy_module is None:
+            self._lazy_module = timed_import(self.__name__)
+        return self._lazy_module
+
+    def __getattr__(self, attribute: str) -> Any:
+        # only called for attributes not found the normal way, i.e. everything from the real module
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state: str = "loaded" if self._lazy_module is not None else "not loaded yet"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    A module that's imported on first use. If it was already imported, you just get the real module.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+@lru_cache(maxsize=None)
+def get_spacy_pipeline(model_name: str = "en_core_web_sm", disable: Tuple[str, ...] = ()) -> Any:
+    """
+    spacy.load(model_name, disable=...), once per process per (model_name, disable). disable must be a tuple (not a
+    list), so it can be part of the cache key.
+    """
+    spacy = timed_import("spacy")
+    start: float = time.perf_counter()
+    nlp = spacy.load(model_name, disable=list(disable))
+    _record(f"spacy.load({model_name})", start)
+    return nlp
+
+
+def _nltk_3_9_or_later() -> bool:
+    # NLTK 3.9 renamed the tagger and tokenizer resources (and moved the tagger weights to JSON, hence load_from_json)
+    nltk_tag = timed_import("nltk.tag")
+    return hasattr(nltk_tag.PerceptronTagger, "load_from_json")
+
+
+def pos_tagging_resources() -> Tuple[Tuple[str, str], ...]:
+    """
+    (package, resource path) for everything word_tokenize + pos_tag_sents(..., tagset='universal') need, under the
+    names the installed NLTK version uses.
+    """
+    if _nltk_3_9_or_later():
+        return (("averaged_perceptron_tagger_eng", "taggers/averaged_perceptron_tagger_eng"),
+                ("punkt_tab", "tokenizers/punkt_tab"), ("universal_tagset", "taggers/universal_tagset"))
+    return (("averaged_perceptron_tagger", "taggers/averaged_perceptron_tagger"),
+            ("punkt", "tokenizers/punkt"), ("universal_tagset", "taggers/universal_tagset"))
+
+
+def ensure_pos_tagging_resources() -> None:
+    for package, resource_path in pos_tagging_resources():
+        ensure_nltk(package, resource_path)
+
+
+@lru_cache(maxsize=None)
+def get_perceptron_tagger() -> Any:
+    """
+    NLTK's averaged perceptron tagger (what pos_tag uses), loaded once per process. Downloads the weights if needed.
+    """
+    nltk_tag = timed_import("nltk.tag")
+    package, resource_path = pos_tagging_resources()[0]
+    ensure_nltk(package, resource_path)
+    start: float = time.perf_counter()
+    tagger = nltk_tag.PerceptronTagger()
+    _record("nltk.tag.PerceptronTagger()", start)
+    return tagger
+
+
+def import_profile() -> Dict[str, float]:
+    """
+    Milliseconds per module import / model load done through this module, slowest first.
+    """
+    with _profile_lock:
+        return dict(sorted(_profile_ms.items(), key=lambda item: item[1], reverse=True))
+
+
+def print_import_profile(file=sys.stderr) -> None:
+    for name, ms in import_profile().items():
+        print(f"{ms:10.1f}ms  {name}", file=file)
+
+
+if __name__ == '__main__':
+    # e.g. python lazy_runtime.py nltk sklearn.svm seaborn
+    for module_name in sys.argv[1:] or ["numpy", "pandas", "sklearn.feature_extraction.text", "nltk", "seaborn", "spacy"]:
+        try:
+            timed_import(module_name)
+        except ImportError as e:
+            print(f"could not import {module_name}: {e}", file=sys.stderr)
+    print_import_profile(file=sys.stdout)
@@ -0,0 +1,163 @@
+"""
+Streaming CSV -> TSV conversion with bounded memory, for files much bigger than number-1-data-text.csv.
+
+number_1.py reads everything it writes into memory first. Here rows are read in fixed-size chunks and written
+incrementally through a buffered file, so memory depends on chunk_rows, not on the size of the file. Three modes:
+- head: only the first n_rows data rows (plus the header), like number_1.py does with its 1000 samples
+- full: every row
+- filter: only rows passing a filter (can be combined with n_rows, which then counts rows written)
+
+Two backends:
+- 'csv': the csv module. row_filter gets each row as a {column: value} dict
+- 'pandas': pd.read_csv(chunksize=...), or the pyarrow streaming reader with backend='pyarrow'. chunk_filter gets each
+  chunk as a DataFrame and returns a boolean mask, so filtering is vectorized
+
+Every column is kept as the raw string from the CSV (no dtype inference), so the output is byte-identical to what
+csv.writer(f, delimiter="\\t") produces in number_1.py, whichever backend is used.
+
+> python csv_to_tsv.py number-1-data-text.csv number_1_1000_elem_as_tsv.tsv --n-rows 1000
+"""
+import csv
+import itertools
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+RowFilter = Callable[[Dict[str, str]], bool]
+ChunkFilter = Callable[[pd.DataFrame], pd.Series]
+
+DEFAULT_CHUNK_ROWS: int = 10_000
+DEFAULT_BUFFER_SIZE: int = 1 << 20  # 1MB write buffer
+
+# csv.writer's default dialect (excel) ends lines with \r\n, so the pandas backends need to as well
+LINE_TERMINATOR: str = "\r\n"
+
+
+def _csv_chunks(reader: Iterator[List[str]], chunk_rows: int) -> Iterator[List[List[str]]]:
+    while chunk := list(itertools.islice(reader, chunk_rows)):
+        yield chunk
+
+
+def convert_with_csv(src: str, dst: str, n_rows: Optional[int] = None, row_filter: Optional[RowFilter] = None,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS, buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Convert with the csv module. Returns the number of data rows written.
+    """
+    num_written: int = 0
+    # newline='' lets the csv module handle line endings itself, which it needs for quoted fields containing newlines
+    with open(src, "r", newline="") as in_f, open(dst, "w", newline="", buffering=buffer_size) as out_f:
+        reader = csv.reader(in_f)
+        writer = csv.writer(out_f, delimiter="\t")
+        header: Optional[List[str]] = next(reader, None)
+        if header is None:
+            return 0
+        writer.writerow(header)
+        for chunk in _csv_chunks(reader, chunk_rows):
+            if row_filter is not None:
+                chunk = [row for row in chunk if row_filter(dict(zip(header, row)))]
+            if n_rows is not None:
+                chunk = chunk[:n_rows - num_written]
+            writer.writerows(chunk)
+            num_written += len(chunk)
+            if n_rows is not None and num_written >= n_rows:
+                break
+    return num_written
+
+
+def _pandas_chunks(src: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    # dtype=str + keep_default_na=False keeps every value exactly as written, e.g. "77.00000" stays "77.00000" instead of
+    # becoming 77.0, and empty fields stay "" instead of becoming NaN
+    yield from pd.read_csv(src, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+
+
+def _pyarrow_chunks(src: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    # read the header first, so we can tell pyarrow every column is a string (again, no type inference)
+    with open(src, "r", newline="") as f:
+        header: List[str] = next(csv.reader(f))
+    reader = pa_csv.open_csv(src, read_options=pa_csv.ReadOptions(block_size=DEFAULT_BUFFER_SIZE),
+                             convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                                                   strings_can_be_null=False))
+    # pyarrow picks its own batch sizes (by bytes), so re-chunk to roughly chunk_rows rows
+    pending: List[pd.DataFrame] = []
+    num_pending: int = 0
+    for batch in reader:
+        pending.append(batch.to_pandas())
+        num_pending += batch.num_rows
+        if num_pending >= chunk_rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending, num_pending = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def convert_with_pandas(src: str, dst: str, n_rows: Optional[int] = None, chunk_filter: Optional[ChunkFilter] = None,
+                        chunk_rows: int = DEFAULT_CHUNK_ROWS, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                        engine: str = "pandas") -> int:
+    """
+    Convert with pandas (engine='pandas') or the pyarrow streaming reader (engine='pyarrow'). Returns the number of
+    data rows written.
+    """
+    chunks: Iterator[pd.DataFrame] = _pyarrow_chunks(src, chunk_rows) if engine == "pyarrow" \
+        else _pandas_chunks(src, chunk_rows)
+    num_written: int = 0
+    with open(dst, "w", newline="", buffering=buffer_size) as out_f:
+        for i, chunk in enumerate(chunks):
+            if chunk_filter is not None:
+                chunk = chunk[chunk_filter(chunk)]
+            if n_rows is not None:
+                chunk = chunk[:n_rows - num_written]
+            # header only with the first chunk, and no index (see number_1.py)
+            chunk.to_csv(out_f, sep="\t", index=False, header=(i == 0), lineterminator=LINE_TERMINATOR)
+            num_written += len(chunk)
+            if n_rows is not None and num_written >= n_rows:
+                break
+    return num_written
+
+
+def convert(src: str, dst: str, n_rows: Optional[int] = None, row_filter: Optional[RowFilter] = None,
+            chunk_filter: Optional[ChunkFilter] = None, backend: str = "csv", chunk_rows: int = DEFAULT_CHUNK_ROWS,
+            buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """
+    Convert src (CSV) to dst (TSV). n_rows=None means the full file. Returns the number of data rows written.
+    """
+    if backend == "csv":
+        if chunk_filter is not None:
+            raise ValueError("chunk_filter needs backend='pandas' or 'pyarrow', use row_filter with backend='csv'")
+        return convert_with_csv(src, dst, n_rows=n_rows, row_filter=row_filter, chunk_rows=chunk_rows,
+                                buffer_size=buffer_size)
+    if backend in ("pandas", "pyarrow"):
+        if row_filter is not None:
+            raise ValueError(f"row_filter needs backend='csv', use chunk_filter with backend='{backend}'")
+        return convert_with_pandas(src, dst, n_rows=n_rows, chunk_filter=chunk_filter, chunk_rows=chunk_rows,
+                                   buffer_size=buffer_size, engine=backend)
+    raise ValueError(f"unknown backend: {backend}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a CSV file to TSV with bounded memory")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--n-rows", type=int, default=None, help="only the first N data rows (default: all)")
+    parser.add_argument("--where", nargs=2, metavar=("COLUMN", "VALUE"), default=None,
+                        help="only rows where COLUMN == VALUE, e.g. --where Sex 'Both sexes'")
+    parser.add_argument("--backend", choices=["csv", "pandas", "pyarrow"], default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    row_filter: Optional[RowFilter] = None
+    chunk_filter: Optional[ChunkFilter] = None
+    if args.where is not None:
+        column, value = args.where
+        if args.backend == "csv":
+            row_filter = lambda row: row[column] == value
+        else:
+            chunk_filter = lambda chunk: chunk[column] == value
+
+    num_written: int = convert(args.src, args.dst, n_rows=args.n_rows, row_filter=row_filter,
+                               chunk_filter=chunk_filter, backend=args.backend, chunk_rows=args.chunk_rows)
+    print(f"Wrote {num_written} rows (+ header) to {args.dst}")
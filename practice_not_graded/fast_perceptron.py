@@ -0,0 +1,274 @@
+"""
+A faster drop-in for pos_tag_sents: the same averaged perceptron weights NLTK uses, scored with NumPy / SciPy.
+
+For every token, NLTK's PerceptronTagger builds 14 feature strings, and looks each up in a dict of dicts, in pure
+Python. Here:
+- the weights become one sparse (feature id x tag) matrix, and a few small dense tables for the features that depend
+  on the previous tags
+- feature ids are memoized per word: a frequent word's feature strings are built and looked up once, not once per
+  occurrence
+- the features that don't depend on previous tags (10 of the 14) are scored for a whole batch of sentences at once,
+  as one sparse matrix product
+- the rest has to go left to right (each tag depends on the two before it), but position t of every sentence in the
+  batch is scored together, with array lookups instead of dicts
+
+The tags are exactly the ones pos_tag_sents gives (including tagset mapping): the only difference in the math is the
+order floating point scores are summed in. Wherever that could matter (the best two tags scoring within 1e-6 of each
+other), that token is scored by NLTK's own code instead.
+
+> tagger = FastPerceptronTagger(tagset='universal')
+> tagged_tweets = tagger.tag_sents(tokenized_tweets)    # == pos_tag_sents(tokenized_tweets, tagset='universal')
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+TaggedSentence = List[Tuple[str, str]]
+
+# best two scores closer than this are re-scored by NLTK, so ties break exactly as pos_tag_sents breaks them
+TIE_TOLERANCE: float = 1e-6
+
+
+class FastPerceptronTagger:
+
+    def __init__(self, tagger=None, tagset: Optional[str] = None, batch_size: int = 1000,
+                 max_cached_words: int = 200_000):
+        """
+        :param tagger: a loaded nltk PerceptronTagger, defaults to the one pos_tag uses
+        :param tagset: as in pos_tag_sents, e.g. 'universal', or None for Penn Treebank tags
+        :param batch_size: number of sentences scored together
+        :param max_cached_words: the feature-id memos are cleared when they reach this many words, so memory stays
+            bounded on an endless stream of new words
+        """
+        if tagger is None:
+            import os
+            import sys
+
+            # lazy_runtime.py lives at the root of this repo
+            sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+            from lazy_runtime import get_perceptron_tagger
+            tagger = get_perceptron_tagger()
+        self.tagger = tagger
+        self.batch_size: int = batch_size
+        self.max_cached_words: int = max_cached_words
+
+        # descending, so that argmax (which returns the first maximum) breaks exact ties toward the alphabetically
+        # last tag, like NLTK's max(classes, key=lambda label: (scores[label], label))
+        self.classes: List[str] = sorted(tagger.classes, reverse=True)
+        class_index: Dict[str, int] = {tag: i for i, tag in enumerate(self.classes)}
+        self.tagdict: Dict[str, int] = {word: class_index[tag] for word, tag in tagger.tagdict.items()}
+        self.start: List[str] = list(tagger.START)
+        # previous-tag values: 0 is START[0], 1 is START[1], then 2 + class id
+        self.prev_values: List[str] = self.start + self.classes
+
+        feature_names: List[str] = list(tagger.model.weights)
+        self.feature_index: Dict[str, int] = {name: i for i, name in enumerate(feature_names)}
+        # one extra all-zero row, for features the model has no weights for
+        self.absent: int = len(feature_names)
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        for row, name in enumerate(feature_names):
+            for tag, weight in tagger.model.weights[name].items():
+                rows.append(row)
+                columns.append(class_index[tag])
+                values.append(weight)
+        self.weights: sp.csr_matrix = sp.csr_matrix((values, (rows, columns)),
+                                                    shape=(len(feature_names) + 1, len(self.classes)))
+
+        # dense score tables for the features that only depend on previous tags, indexed by prev (and prev2) value id
+        num_prev: int = len(self.prev_values)
+        self.prev1_scores: np.ndarray = self._dense([f"i-1 tag {prev}" for prev in self.prev_values])
+        self.prev2_scores: np.ndarray = self._dense([f"i-2 tag {prev2}" for prev2 in self.prev_values])
+        self.prev_pair_scores: np.ndarray = self._dense(
+            [f"i tag+i-2 tag {prev} {prev2}" for prev in self.prev_values for prev2 in self.prev_values]
+        ).reshape(num_prev, num_prev, len(self.classes))
+        self.bias: int = self.feature_index.get("bias", self.absent)
+
+        self.tag_names: List[str] = self.classes
+        if tagset:
+            from nltk.tag.mapping import map_tag
+            self.tag_names = [map_tag("en-ptb", tagset, tag) for tag in self.classes]
+
+        # memos: raw word -> (normalized word, its own feature ids), normalized word -> ids of its features as a
+        # neighbor, and normalized word -> "i-1 tag+i word" feature id for every previous tag
+        self._word_memo: Dict[str, Tuple[str, Tuple[int, int]]] = {}
+        self._context_memo: Dict[str, Tuple[int, int, int, int, int, int, int]] = {}
+        self._prev_word_memo: Dict[str, np.ndarray] = {}
+
+    def _id(self, name: str) -> int:
+        return self.feature_index.get(name, self.absent)
+
+    def _dense(self, names: List[str]) -> np.ndarray:
+        return self.weights[[self._id(name) for name in names]].toarray()
+
+    def _word_features(self, word: str) -> Tuple[str, Tuple[int, int]]:
+        memo = self._word_memo.get(word)
+        if memo is None:
+            if len(self._word_memo) >= self.max_cached_words:
+                self._word_memo.clear()
+            memo = self._word_memo[word] = (
+                self.tagger.normalize(word),
+                (self._id(f"i suffix {word[-3:]}"), self._id(f"i pref1 {word[0] if word else ''}"))
+            )
+        return memo
+
+    def _context_features(self, normalized: str) -> Tuple[int, int, int, int, int, int, int]:
+        # the ids of this (normalized) word's features in each position it can have relative to the tagged word:
+        # i word, i-1 word, i-1 suffix, i-2 word, i+1 word, i+1 suffix, i+2 word
+        memo = self._context_memo.get(normalized)
+        if memo is None:
+            if len(self._context_memo) >= self.max_cached_words:
+                self._context_memo.clear()
+            suffix: str = normalized[-3:]
+            memo = self._context_memo[normalized] = (
+                self._id(f"i word {normalized}"), self._id(f"i-1 word {normalized}"),
+                self._id(f"i-1 suffix {suffix}"), self._id(f"i-2 word {normalized}"),
+                self._id(f"i+1 word {normalized}"), self._id(f"i+1 suffix {suffix}"), self._id(f"i+2 word {normalized}")
+            )
+        return memo
+
+    def _prev_word_features(self, normalized: str) -> np.ndarray:
+        memo = self._prev_word_memo.get(normalized)
+        if memo is None:
+            if len(self._prev_word_memo) >= self.max_cached_words:
+                self._prev_word_memo.clear()
+            memo = self._prev_word_memo[normalized] = np.array(
+                [self._id(f"i-1 tag+i word {prev} {normalized}") for prev in self.prev_values], dtype=np.int64)
+        return memo
+
+    def _tag_batch(self, sentences: Sequence[Sequence[str]]) -> List[List[int]]:
+        lengths: np.ndarray = np.array([len(sentence) for sentence in sentences], dtype=np.int64)
+        offsets: np.ndarray = np.concatenate(([0], np.cumsum(lengths)))
+        num_tokens: int = int(offsets[-1])
+        contexts: List[List[str]] = []
+        # static_ids[token] = ids of the 10 features that don't depend on previous tags
+        static_ids: np.ndarray = np.empty((num_tokens, 10), dtype=np.int64)
+        prev_word_ids: np.ndarray = np.empty((num_tokens, len(self.prev_values)), dtype=np.int64)
+        tagdict_tags: np.ndarray = np.full(num_tokens, -1, dtype=np.int64)
+        end: List[str] = list(self.tagger.END)
+        token: int = 0
+        for sentence in sentences:
+            word_features = [self._word_features(word) for word in sentence]
+            context: List[str] = self.start + [normalized for normalized, _ in word_features] + end
+            contexts.append(context)
+            context_features = [self._context_features(normalized) for normalized in context]
+            for i, word in enumerate(sentence):
+                # position i in the sentence is position i + 2 in context (after the 2 START tokens)
+                _, (suffix_id, pref1_id) = word_features[i]
+                static_ids[token] = (self.bias, suffix_id, pref1_id, context_features[i + 2][0],
+                                     context_features[i + 1][1], context_features[i + 1][2],
+                                     context_features[i][3], context_features[i + 3][4],
+                                     context_features[i + 3][5], context_features[i + 4][6])
+                prev_word_ids[token] = self._prev_word_features(context[i + 2])
+                tagdict_tags[token] = self.tagdict.get(word, -1)
+                token += 1
+
+        # sum the 10 static feature rows of every token at once: (tokens x features indicator) @ (features x tags)
+        indicator = sp.csr_matrix((np.ones(static_ids.size), static_ids.ravel(),
+                                   np.arange(0, static_ids.size + 1, 10)),
+                                  shape=(num_tokens, self.weights.shape[0]))
+        static_scores: np.ndarray = (indicator @ self.weights).toarray()
+
+        tags: np.ndarray = np.empty(num_tokens, dtype=np.int64)
+        prev: np.ndarray = np.zeros(len(sentences), dtype=np.int64)
+        prev2: np.ndarray = np.ones(len(sentences), dtype=np.int64)
+        for position in range(int(lengths.max(initial=0))):
+            active: np.ndarray = np.flatnonzero(lengths > position)
+            token_ids: np.ndarray = offsets[active] + position
+            active_prev, active_prev2 = prev[active], prev2[active]
+            scores: np.ndarray = (static_scores[token_ids] + self.prev1_scores[active_prev]
+                                  + self.prev2_scores[active_prev2] + self.prev_pair_scores[active_prev, active_prev2]
+                                  + self.weights[prev_word_ids[token_ids, active_prev]].toarray())
+            best: np.ndarray = scores.argmax(axis=1)
+            # words in NLTK's tagdict (frequent, unambiguous words) skip the model entirely
+            known: np.ndarray = tagdict_tags[token_ids]
+            if scores.shape[1] > 1:
+                top_two: np.ndarray = np.partition(scores, -2, axis=1)[:, -2:]
+                for j in np.flatnonzero((top_two[:, 1] - top_two[:, 0] < TIE_TOLERANCE) & (known < 0)):
+                    best[j] = self._nltk_predict(sentences[active[j]], contexts[active[j]], position,
+                                                 active_prev[j], active_prev2[j])
+            best = np.where(known >= 0, known, best)
+            tags[token_ids] = best
+            prev2[active] = active_prev
+            prev[active] = best + 2
+        return [tags[offsets[i]:offsets[i + 1]].tolist() for i in range(len(sentences))]
+
+    def _nltk_predict(self, sentence: Sequence[str], context: List[str], position: int, prev: int, prev2: int) -> int:
+        features = self.tagger._get_features(position, sentence[position], context, self.prev_values[prev],
+                                             self.prev_values[prev2])
+        tag, _ = self.tagger.model.predict(features)
+        return self.classes.index(tag)
+
+    def tag_sents(self, sentences: Sequence[Sequence[str]]) -> List[TaggedSentence]:
+        """
+        The same output as nltk.pos_tag_sents(sentences, tagset=self.tagset).
+        """
+        tagged: List[TaggedSentence] = []
+        for start in range(0, len(sentences), self.batch_size):
+            batch: Sequence[Sequence[str]] = sentences[start:start + self.batch_size]
+            for sentence, tag_ids in zip(batch, self._tag_batch(batch)):
+                tagged.append([(word, self.tag_names[tag_id]) for word, tag_id in zip(sentence, tag_ids)])
+        return tagged
+
+    def tag(self, tokens: Sequence[str]) -> TaggedSentence:
+        return self.tag_sents([tokens])[0]
+
+
+def benchmark(tokenized: Sequence[Sequence[str]], tagset: Optional[str] = 'universal') -> Dict[str, Dict[str, float]]:
+    """
+    Tag tokenized with pos_tag_sents and with FastPerceptronTagger, checking they agree. Returns tokens/s and peak
+    memory allocated (from Python, via tracemalloc) for each. Weights are loaded before timing, for both.
+    """
+    import time
+    import tracemalloc
+
+    from nltk import pos_tag_sents
+
+    num_tokens: int = sum(len(sentence) for sentence in tokenized)
+    # load NLTK's tagger (pos_tag_sents caches it) and build the fast one outside the timed runs
+    pos_tag_sents(tokenized[:1], tagset=tagset)
+    fast_tagger = FastPerceptronTagger(tagset=tagset)
+
+    results: Dict[str, Dict[str, float]] = {}
+    outputs: Dict[str, List[TaggedSentence]] = {}
+    for name, tag_sents in (("nltk", lambda sentences: pos_tag_sents(sentences, tagset=tagset)),
+                            ("fast", fast_tagger.tag_sents)):
+        tracemalloc.start()
+        start: float = time.perf_counter()
+        outputs[name] = tag_sents(tokenized)
+        seconds: float = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {"seconds": seconds, "tokens_per_s": num_tokens / seconds if seconds > 0 else 0.0,
+                         "peak_mem_mb": peak_bytes / 2 ** 20}
+    if outputs["nltk"] != outputs["fast"]:
+        mismatches: int = sum(nltk_tags != fast_tags for nltk_tags, fast_tags in zip(outputs["nltk"], outputs["fast"]))
+        raise AssertionError(f"fast tagger disagrees with pos_tag_sents on {mismatches} sentences")
+    return results
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    from nltk import word_tokenize
+    from nltk.corpus import twitter_samples
+
+    # lazy_runtime.py lives at the root of this repo
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from lazy_runtime import ensure_nltk, ensure_pos_tagging_resources
+
+    ensure_nltk('twitter_samples')
+    # the tagger and tokenizer models, under the resource names this NLTK version uses (they changed in 3.9)
+    ensure_pos_tagging_resources()
+
+    # load the tweets in file "tweets.20150430-223406.json"
+    tweets: List[str] = twitter_samples.strings("tweets.20150430-223406.json")
+    tokenized_tweets: List[List[str]] = [word_tokenize(tweet) for tweet in tweets]
+
+    for name, result in benchmark(tokenized_tweets).items():
+        print(f"{name}: {result['seconds']:.2f}s, {result['tokens_per_s']:.0f} tokens/s, "
+              f"peak {result['peak_mem_mb']:.1f}MB")
+    print("tags match pos_tag_sents(..., tagset='universal') exactly")
@@ -0,0 +1,232 @@
+"""
+Pluggable counters for the top-k nouns in the number_2 POS scripts: exact (the default), or fixed-memory sketches.
+
+An exact Counter/FreqDist keeps one entry per distinct noun, forever. On a continuous stream of tweets, that grows
+without bound. The sketches here use a fixed amount of memory, in exchange for approximate counts with known error:
+
+- SpaceSavingCounter(capacity): tracks at most `capacity` nouns. When a new noun arrives and it's full, it replaces the
+  noun with the smallest count, and inherits that count (+1) as a possible over-count, recorded as its error. Every
+  reported count is at most `error` too high, and any noun occurring more than N / capacity times is guaranteed to be
+  tracked (N = total nouns counted).
+- CountMinTopK(epsilon, delta, k): a Count-Min sketch (a depth x width table of counters, one hash function per row)
+  plus the k heaviest nouns seen so far. Estimates are never too low, and with probability 1 - delta are at most
+  epsilon * N too high. Memory depends on epsilon and delta only, not on the number of distinct nouns.
+
+All counters share the same small interface: update(items), most_common(k), merge(other) and guarantee(), so they're
+interchangeable in the counting code, and per-worker counters can be merged. Sketches to be merged must be built with
+the same parameters. Hashing uses blake2b (not Python's hash(), which is randomized per process), so sketches built in
+different worker processes agree.
+
+> nouns = make_counter("space_saving", capacity=10_000)
+> nouns.update(token for token, tag in tagged if tag == 'NOUN')
+> print(format_top_k(nouns, 10))
+"""
+import hashlib
+import heapq
+import math
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+
+class ExactCounter(Counter):
+    """
+    A Counter with the same interface as the sketches. Counts are exact, memory grows with the number of distinct items.
+    """
+
+    def merge(self, other: "ExactCounter") -> "ExactCounter":
+        self.update(other)
+        return self
+
+    def guarantee(self) -> str:
+        return "exact counts"
+
+
+class SpaceSavingCounter:
+
+    def __init__(self, capacity: int = 10_000):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity: int = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self.total: int = 0
+        # min-heap of (count, item). Counts only grow, so entries can be stale (too low): those are fixed up lazily
+        # when they reach the top of the heap, instead of on every increment
+        self._heap: List[Tuple[int, Any]] = []
+
+    def _pop_min(self) -> Hashable:
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item
+            if item in self.counts:
+                heapq.heappush(self._heap, (self.counts[item], item))
+
+    def _add(self, item: Hashable, count: int, error: int = 0) -> None:
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+            self.errors[item] += error
+            return
+        if len(self.counts) >= self.capacity:
+            evicted: Hashable = self._pop_min()
+            evicted_count: int = self.counts.pop(evicted)
+            self.errors.pop(evicted)
+            # the new item may have occurred up to evicted_count times before, while it wasn't tracked
+            count += evicted_count
+            error += evicted_count
+        self.counts[item] = count
+        self.errors[item] = error
+        heapq.heappush(self._heap, (count, item))
+
+    def update(self, items: Iterable[Hashable]) -> None:
+        for item in items:
+            self._add(item, 1)
+
+    def most_common(self, k: int) -> List[Tuple[Hashable, int]]:
+        return heapq.nlargest(k, self.counts.items(), key=lambda entry: entry[1])
+
+    def error(self, item: Hashable) -> int:
+        return self.errors.get(item, 0)
+
+    def merge(self, other: "SpaceSavingCounter") -> "SpaceSavingCounter":
+        """
+        Merge another summary into this one (the mergeable Space-Saving of Agarwal et al.): an item missing from one
+        summary may have occurred up to that summary's minimum count there, so that is added as both count and error.
+        The result keeps the `capacity` largest, so the N / capacity guarantee still holds for the combined stream.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("can only merge SpaceSavingCounters with the same capacity")
+        self_min: int = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        other_min: int = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        merged_counts: Dict[Hashable, int] = {}
+        merged_errors: Dict[Hashable, int] = {}
+        for item in set(self.counts) | set(other.counts):
+            merged_counts[item] = self.counts.get(item, self_min) + other.counts.get(item, other_min)
+            merged_errors[item] = self.errors.get(item, self_min) + other.errors.get(item, other_min)
+        kept = heapq.nlargest(self.capacity, merged_counts.items(), key=lambda entry: entry[1])
+        self.counts = dict(kept)
+        self.errors = {item: merged_errors[item] for item in self.counts}
+        self.total += other.total
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def guarantee(self) -> str:
+        return (f"Space-Saving, capacity={self.capacity}: each count is at most its error too high, and every item "
+                f"with more than N/capacity = {self.total / self.capacity:.1f} occurrences is in the summary")
+
+
+class CountMinTopK:
+
+    def __init__(self, epsilon: float = 1e-4, delta: float = 1e-3, k: int = 100):
+        self.epsilon: float = epsilon
+        self.delta: float = delta
+        self.k: int = k
+        # the standard sizing: width = e / epsilon, depth = ln(1 / delta)
+        self.width: int = math.ceil(math.e / epsilon)
+        self.depth: int = math.ceil(math.log(1 / delta))
+        self.table: np.ndarray = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total: int = 0
+        # candidate heavy hitters: item -> estimated count, at most k of them (plus a little slack, see _prune)
+        self.top: Dict[Hashable, int] = {}
+        self._rows: np.ndarray = np.arange(self.depth)
+
+    def _columns(self, item: Hashable) -> np.ndarray:
+        # one 128-bit hash, split in two, gives all depth hash functions: h_i = h1 + i * h2 (mod width)
+        digest: bytes = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        h1: int = int.from_bytes(digest[:8], "little")
+        h2: int = int.from_bytes(digest[8:], "little") | 1
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)], dtype=np.int64)
+
+    def estimate(self, item: Hashable) -> int:
+        return int(self.table[self._rows, self._columns(item)].min())
+
+    def _add(self, item: Hashable, count: int) -> None:
+        columns: np.ndarray = self._columns(item)
+        self.table[self._rows, columns] += count
+        self.total += count
+        self.top[item] = int(self.table[self._rows, columns].min())
+        if len(self.top) > 2 * self.k:
+            self._prune()
+
+    def _prune(self) -> None:
+        # keeping 2k candidates between prunes means we don't sort on every update
+        self.top = dict(heapq.nlargest(self.k, self.top.items(), key=lambda entry: entry[1]))
+
+    def update(self, items: Iterable[Hashable]) -> None:
+        for item, count in Counter(items).items():
+            self._add(item, count)
+
+    def most_common(self, k: int) -> List[Tuple[Hashable, int]]:
+        if k > self.k:
+            raise ValueError(f"this sketch only tracks the top {self.k}")
+        return heapq.nlargest(k, ((item, self.estimate(item)) for item in self.top), key=lambda entry: entry[1])
+
+    def error(self, item: Hashable) -> float:
+        return self.epsilon * self.total
+
+    def merge(self, other: "CountMinTopK") -> "CountMinTopK":
+        if (other.width, other.depth, other.k) != (self.width, self.depth, self.k):
+            raise ValueError("can only merge CountMinTopK sketches with the same epsilon, delta and k")
+        self.table += other.table
+        self.total += other.total
+        # re-estimate every candidate from the combined table
+        self.top = {item: self.estimate(item) for item in set(self.top) | set(other.top)}
+        self._prune()
+        return self
+
+    def guarantee(self) -> str:
+        return (f"Count-Min, {self.depth}x{self.width} table: counts are never too low, and with probability "
+                f"{1 - self.delta:.4f} at most epsilon*N = {self.epsilon * self.total:.1f} too high")
+
+
+def make_counter(mode: str = "exact", **params: Any):
+    """
+    A noun counter by name: "exact" (default), "space_saving" (params: capacity) or "count_min" (epsilon, delta, k).
+    """
+    if mode == "exact":
+        return ExactCounter()
+    if mode == "space_saving":
+        return SpaceSavingCounter(**params)
+    if mode == "count_min":
+        return CountMinTopK(**params)
+    raise ValueError(f"unknown counter mode: {mode}")
+
+
+def format_top_k(counter, k: int = 10) -> str:
+    """
+    most_common(k), with each count's error bound (if any) and the counter's overall guarantee.
+    """
+    lines: List[str] = [f"Top-{k} ({counter.guarantee()}):"]
+    for item, count in counter.most_common(k):
+        error = counter.error(item) if hasattr(counter, "error") else 0
+        lines.append(f"  {item!r}: {count}" + (f" (+/- up to {error:g} over)" if error else ""))
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+
+    # a Zipf-like stream of fake "nouns", to compare the sketches against exact counts
+    random.seed(0)
+    vocabulary: List[str] = [f"noun{i}" for i in range(50_000)]
+    weights: List[float] = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    stream: List[str] = random.choices(vocabulary, weights=weights, k=500_000)
+
+    for mode, params in (("exact", {}), ("space_saving", {"capacity": 2_000}),
+                         ("count_min", {"epsilon": 1e-3, "delta": 1e-3, "k": 100})):
+        # count in 4 "workers", then merge, like number_2_w_nltk_parallel.py does
+        counters = [make_counter(mode, **params) for _ in range(4)]
+        for i, counter in enumerate(counters):
+            counter.update(stream[i::4])
+        merged = counters[0]
+        for counter in counters[1:]:
+            merged.merge(counter)
+        memory: int = len(merged) if mode == "exact" else \
+            (len(merged.counts) if mode == "space_saving" else merged.table.size)
+        print(f"\n===== {mode} ({memory} counters) =====")
+        print(format_top_k(merged, 10), file=sys.stdout)
@@ -12,8 +12,13 @@ Prepare another file where you save the 1000 samples as a tab separated value
 """
 
 import os
+import shutil
+import sys
 from typing import Any, List
-import requests
+
+# data_registry.py lives at the root of this repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_registry import fetch
 
 # I've done some non-essential steps for my own convenience:
 # 1) Downloading data from within the script, only if not already saved to a file (which I otherwise trust implicitly)
@@ -23,12 +28,10 @@ MY_FILE_NAME: str = "number-1-data-text.csv"
 
 def download_if_not_present(file_name: str = MY_FILE_NAME):
     if not os.path.exists(file_name):
-        print(f"Downloading {RAW_GITHUBUSERCONTENT_LINK} to {file_name} and saving...")
-        data: bytes = requests.get(RAW_GITHUBUSERCONTENT_LINK).content
-
-        # using 'wb' to allow writing of bytes, instead of a str, etc
-        with open(file_name, "wb") as f:
-            f.write(data)
+        # fetch uses the shared cache (or the copy vendored in this repo), and only downloads if neither is there.
+        # See data_registry.py
+        print(f"Copying {RAW_GITHUBUSERCONTENT_LINK} to {file_name}...")
+        shutil.copyfile(fetch("who_life_expectancy"), file_name)
         print("Saved.")
 
 if __name__ == '__main__':
@@ -64,5 +67,5 @@ if __name__ == '__main__':
         writer.writerows(data)
 
     # Prepare another file where you save the 1000 samples as a tab separated value (from pandas)
-    # index = False prevents leading integers!
-    df.to_csv("number_1_1000_elem_as_tsv_pandas.tsv", sep="\t", index=False)
+    # index = False prevents leading integers! Write small_df (the 1000 samples), not the whole df
+    small_df.to_csv("number_1_1000_elem_as_tsv_pandas.tsv", sep="\t", index=False)
@@ -14,15 +14,22 @@ Find the top-10 nouns.
 """
 
 from collections import Counter
+import os
+import sys
 from typing import List, Tuple
-import nltk
-from nltk.corpus import twitter_samples
 from pprint import pprint
 
+# ensure_nltk only calls nltk.download for resources that aren't installed yet (see lazy_runtime.py, at the root of this repo)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lazy_runtime import ensure_nltk, ensure_pos_tagging_resources, print_import_profile, timed_import
+
+# timed_import is a plain import that also records how long it took, for the import profile printed at the end
+twitter_samples = timed_import('nltk.corpus').twitter_samples
+
 # check out what files are included in the corpus:
-nltk.download('twitter_samples')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('universal_tagset')
+ensure_nltk('twitter_samples')
+# the tagger and tokenizer models, under the resource names this NLTK version uses (they changed in 3.9)
+ensure_pos_tagging_resources()
 print("File IDs:", twitter_samples.fileids())
 
 # load the tweets in file "tweets.20150430-223406.json"
@@ -68,4 +75,5 @@ noun_dist: FreqDist = FreqDist(
 # then, we'll print the most common ones using most_common(10)
 pprint(noun_dist.most_common(10))
 
-
+# how long each import / model load above took
+print_import_profile()
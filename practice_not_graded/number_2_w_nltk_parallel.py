@@ -0,0 +1,148 @@
+"""
+Same task as number_2_w_nltk_optimized.py, but split into chunks and tokenized + tagged in a process pool.
+
+Import Twitter Corpus from NLTK. For each of the tweets in the tweets.20150430-223406.json corpus, apply tokenization
+and POS tagging. Find the total number of adjectives and nouns, and output them. Find the top-10 nouns.
+
+The output should be exactly the same as the serial script. The functions here are importable, so other scripts can
+re-use the engine on their own list of tweets:
+
+> from number_2_w_nltk_parallel import parallel_pos_counts
+> pos_dist, noun_dist = parallel_pos_counts(tweets, chunk_size=2000, num_workers=8)
+
+Noun counts are exact by default. For a corpus with too many distinct nouns to hold, pass a fixed-memory sketch from
+noun_counters.py instead; each worker fills its own sketch and the sketches are merged:
+
+> from functools import partial
+> from noun_counters import format_top_k, make_counter
+> pos_dist, nouns = parallel_pos_counts(tweets, make_noun_counter=partial(make_counter, "space_saving", capacity=5000))
+> print(format_top_k(nouns, 10))
+"""
+import os
+import sys
+from functools import partial
+from multiprocessing import Pool
+from pprint import pprint
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+# lazy_runtime.py lives at the root of this repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lazy_runtime import ensure_nltk, ensure_pos_tagging_resources, lazy_import
+
+if TYPE_CHECKING:
+    from nltk import FreqDist
+
+# importing this module (e.g. from pos_benchmark.py) doesn't import nltk: that happens the first time a chunk is
+# counted, in whichever process counts it
+nltk = lazy_import("nltk")
+
+# (POS counts, noun counts) for a chunk of tweets or for the whole corpus. Noun counts are a FreqDist, unless a
+# make_noun_counter is given (then they're whatever it returns, e.g. a sketch from noun_counters.py)
+PosCounts = Tuple["FreqDist", Any]
+
+DEFAULT_CHUNK_SIZE: int = 2000
+
+
+def chunked(tweets: Sequence[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Sequence[str]]:
+    """
+    Yield consecutive slices of tweets, each with at most chunk_size items.
+    """
+    for start in range(0, len(tweets), chunk_size):
+        yield tweets[start:start + chunk_size]
+
+
+def tokenize_and_tag_chunk(tweets: Sequence[str], make_noun_counter: Optional[Callable[[], Any]] = None) -> PosCounts:
+    """
+    Tokenize and tag one chunk of tweets, returning only the counts. The tagged tuples are dropped as soon as the
+    chunk is counted, so a worker only ever holds one chunk's worth of (token, tag) pairs in memory.
+    """
+    tokenized_tweets: List[List[str]] = [nltk.word_tokenize(tweet) for tweet in tweets]
+    tagged_tweets: List[List[Tuple[str, str]]] = nltk.pos_tag_sents(tokenized_tweets, tagset='universal')
+    pos_dist: FreqDist = nltk.FreqDist(samples=(tag for tweet in tagged_tweets for (token, tag) in tweet))
+    nouns: Iterator[str] = (token for tweet in tagged_tweets for (token, tag) in tweet if tag == 'NOUN')
+    if make_noun_counter is None:
+        return pos_dist, nltk.FreqDist(samples=nouns)
+    noun_counter = make_noun_counter()
+    noun_counter.update(nouns)
+    return pos_dist, noun_counter
+
+
+def merge_counts(partials: Iterator[PosCounts]) -> PosCounts:
+    """
+    Merge per-chunk counts into totals. Partials must arrive in chunk order: FreqDist is a Counter, so keys keep the
+    order they were first seen in, and merging in order keeps most_common() tie-breaking the same as the serial script.
+    """
+    pos_dist: FreqDist = nltk.FreqDist()
+    noun_dist = None
+    for chunk_pos_dist, chunk_noun_dist in partials:
+        pos_dist.update(chunk_pos_dist)
+        if noun_dist is None:
+            noun_dist = chunk_noun_dist
+        elif hasattr(noun_dist, "merge"):
+            # a sketch from noun_counters.py
+            noun_dist.merge(chunk_noun_dist)
+        else:
+            noun_dist.update(chunk_noun_dist)
+    return pos_dist, noun_dist if noun_dist is not None else nltk.FreqDist()
+
+
+def parallel_pos_counts(tweets: Sequence[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        num_workers: Optional[int] = None,
+                        make_noun_counter: Optional[Callable[[], Any]] = None) -> PosCounts:
+    """
+    Count universal POS tags and NOUN tokens over all tweets, tagging chunks in a process pool.
+
+    :param tweets: the tweets to tag
+    :param chunk_size: number of tweets sent to a worker at a time. Larger chunks mean less inter-process overhead,
+        smaller chunks mean better load balancing and lower per-worker memory
+    :param num_workers: number of processes, defaults to os.cpu_count(). With 1 worker, no pool is created at all.
+    :param make_noun_counter: None for exact noun counts, or a picklable function returning a new counter with
+        update() and merge(), e.g. partial(make_counter, "count_min", epsilon=1e-4) from noun_counters.py
+    :return: (pos_dist, noun_dist), the same FreqDists number_2_w_nltk_optimized.py builds (noun_dist is the merged
+        counter instead, if make_noun_counter is given)
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    count_chunk = partial(tokenize_and_tag_chunk, make_noun_counter=make_noun_counter)
+    if num_workers == 1:
+        return merge_counts(count_chunk(chunk) for chunk in chunked(tweets, chunk_size))
+    with Pool(processes=num_workers) as pool:
+        # imap (not imap_unordered!) yields results in submission order, which merge_counts relies on
+        return merge_counts(pool.imap(count_chunk, chunked(tweets, chunk_size)))
+
+
+if __name__ == '__main__':
+    import argparse
+    from nltk.corpus import twitter_samples
+
+    from noun_counters import format_top_k, make_counter
+
+    parser = argparse.ArgumentParser(description="Parallel NLTK POS counts over the NLTK twitter corpus")
+    parser.add_argument("--noun-counter", choices=["exact", "space_saving", "count_min"], default="exact")
+    parser.add_argument("--capacity", type=int, default=5000, help="space_saving: number of nouns tracked")
+    parser.add_argument("--epsilon", type=float, default=1e-4, help="count_min: error bound, as a fraction of # NOUN")
+    parser.add_argument("--delta", type=float, default=1e-3, help="count_min: probability the bound doesn't hold")
+    args = parser.parse_args()
+
+    # download once in the parent process, so the workers don't race each other to do it
+    ensure_nltk('twitter_samples')
+    # the tagger and tokenizer models, under the resource names this NLTK version uses (they changed in 3.9)
+    ensure_pos_tagging_resources()
+
+    # load the tweets in file "tweets.20150430-223406.json"
+    tweets: List[str] = twitter_samples.strings("tweets.20150430-223406.json")
+
+    if args.noun_counter == "exact":
+        pos_dist, noun_dist = parallel_pos_counts(tweets)
+    else:
+        params = {"capacity": args.capacity} if args.noun_counter == "space_saving" else \
+            {"epsilon": args.epsilon, "delta": args.delta, "k": 10}
+        pos_dist, noun_dist = parallel_pos_counts(tweets, make_noun_counter=partial(make_counter, args.noun_counter,
+                                                                                    **params))
+
+    print(f"# NOUN: {pos_dist['NOUN']}, # ADJ: {pos_dist['ADJ']}")
+
+    # then, we'll print the most common ones using most_common(10)
+    if args.noun_counter == "exact":
+        pprint(noun_dist.most_common(10))
+    else:
+        print(format_top_k(noun_dist, 10))
@@ -14,25 +14,32 @@ Find the top-10 nouns.
 """
 
 from collections import Counter
+import os
+import sys
 from typing import List, Tuple
-import nltk
-from nltk.corpus import twitter_samples
 from pprint import pprint
 
+# ensure_nltk only calls nltk.download for resources that aren't installed yet (see lazy_runtime.py, at the root of this repo)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lazy_runtime import ensure_nltk, get_spacy_pipeline, print_import_profile, timed_import
+
+# timed_import is a plain import that also records how long it took, for the import profile printed at the end
+twitter_samples = timed_import('nltk.corpus').twitter_samples
+
 # check out what files are included in the corpus:
-nltk.download('twitter_samples')
+ensure_nltk('twitter_samples')
 print("File IDs:", twitter_samples.fileids())
 
 # load the tweets in file "tweets.20150430-223406.json"
 tweets: List[str] = twitter_samples.strings("tweets.20150430-223406.json")
 
 # tokenizing and tagging in one step with spacy
-import spacy
-from spacy.tokens.doc import Doc
-
 # nlp(...) typically does the following steps, all as one 'pipeline'
 # tokenize -> tag -> parse -> NER ... to produce a Doc, which idisable heavy pipeline steps
-nlp = spacy.load('en_core_web_sm', disable=['ner', 'parser'])
+# get_spacy_pipeline calls spacy.load once per process, and returns the same pipeline after that
+nlp = get_spacy_pipeline('en_core_web_sm', disable=('ner', 'parser'))
+# spacy is already imported (and timed) by get_spacy_pipeline, so this import is free
+from spacy.tokens.doc import Doc
 
 
 
@@ -57,4 +64,7 @@ print(f"# NOUN: {pos_counts['NOUN']}, # ADJ: {pos_counts['ADJ']}")
 noun_counts: Counter[str] = Counter(str(token) for token in doc if token.pos_ == 'NOUN')
 
 # then, we'll print the most common ones using most_common(10)
-pprint(noun_counts.most_common(10))
\ No newline at end of file
+pprint(noun_counts.most_common(10))
+
+# how long each import / model load above took
+print_import_profile()
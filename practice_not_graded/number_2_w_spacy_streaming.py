@@ -0,0 +1,96 @@
+"""
+Same task as number_2_w_spacy.py, but streaming tweets through nlp.pipe instead of joining them into one giant Doc.
+
+Import Twitter Corpus from NLTK. For each of the tweets in the tweets.20150430-223406.json corpus, apply tokenization
+and POS tagging. Find the total number of adjectives and nouns, and output them. Find the top-10 nouns.
+
+number_2_w_spacy.py has to hold the whole joined string and its Doc in memory at once, so memory grows with the corpus.
+Here, each Doc is counted as soon as it arrives and then dropped, so peak memory depends on batch_size, not on the
+number of tweets. Counts can differ very slightly from the joined version, since each tweet is now tagged on its own
+instead of with its neighbors as context (which is arguably more correct anyway).
+
+Noun counts still grow with the number of distinct nouns, though. To cap that too, pass a fixed-memory sketch from
+noun_counters.py as noun_counter.
+"""
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Tuple
+
+# only for type hints: importing this module (e.g. from pos_benchmark.py) shouldn't import spacy. The caller's
+# get_spacy_pipeline does that, when a pipeline is actually needed
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens.doc import Doc
+
+DEFAULT_BATCH_SIZE: int = 256
+
+
+def streaming_pos_counts(nlp: "Language", tweets: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                         n_process: int = 1, noun_counter: Optional[Any] = None) -> Tuple[Counter, Any]:
+    """
+    Count POS tags and NOUN tokens over a stream of tweets.
+
+    :param nlp: a loaded spaCy pipeline. Disable what you don't need (e.g. ner, parser) before passing it in!
+    :param tweets: any iterable of strings, which can be a generator, so the corpus never needs to be in memory
+    :param batch_size: number of tweets spaCy processes together. Larger batches are usually faster in total, smaller
+        batches mean lower memory and the first counts come back sooner (lower latency)
+    :param n_process: number of processes for nlp.pipe to use. 1 keeps everything in this process
+    :param noun_counter: what to count nouns with, anything with update(), e.g. make_counter("space_saving") from
+        noun_counters.py. Defaults to an (exact) Counter
+    :return: (pos_counts, noun_counts)
+    """
+    pos_counts: Counter[str] = Counter()
+    noun_counts = noun_counter if noun_counter is not None else Counter()
+    for doc in nlp.pipe(tweets, batch_size=batch_size, n_process=n_process):
+        doc: "Doc"
+        pos_counts.update(token.pos_ for token in doc)
+        # str(token) is the token text, without attributes like .pos_ (see number_2_w_spacy.py)
+        noun_counts.update(str(token) for token in doc if token.pos_ == 'NOUN')
+        # nothing else holds a reference to doc, so it is freed as soon as we move to the next one
+    return pos_counts, noun_counts
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import sys
+    from pprint import pprint
+
+    from nltk.corpus import twitter_samples
+
+    # lazy_runtime.py lives at the root of this repo
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from lazy_runtime import ensure_nltk, get_spacy_pipeline
+    from noun_counters import format_top_k, make_counter
+
+    parser = argparse.ArgumentParser(description="Streaming spaCy POS counts over the NLTK twitter corpus")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--noun-counter", choices=["exact", "space_saving", "count_min"], default="exact")
+    parser.add_argument("--capacity", type=int, default=5000, help="space_saving: number of nouns tracked")
+    parser.add_argument("--epsilon", type=float, default=1e-4, help="count_min: error bound, as a fraction of # NOUN")
+    parser.add_argument("--delta", type=float, default=1e-3, help="count_min: probability the bound doesn't hold")
+    args = parser.parse_args()
+
+    ensure_nltk('twitter_samples')
+
+    # load the tweets in file "tweets.20150430-223406.json"
+    tweets: List[str] = twitter_samples.strings("tweets.20150430-223406.json")
+
+    nlp = get_spacy_pipeline('en_core_web_sm', disable=('ner', 'parser'))
+
+    # no need to touch nlp.max_length here: no single Doc is ever longer than one tweet
+    if args.noun_counter == "exact":
+        noun_counter = None
+    elif args.noun_counter == "space_saving":
+        noun_counter = make_counter("space_saving", capacity=args.capacity)
+    else:
+        noun_counter = make_counter("count_min", epsilon=args.epsilon, delta=args.delta, k=10)
+    pos_counts, noun_counts = streaming_pos_counts(nlp, tweets, batch_size=args.batch_size, n_process=args.n_process,
+                                                   noun_counter=noun_counter)
+    print(f"# NOUN: {pos_counts['NOUN']}, # ADJ: {pos_counts['ADJ']}")
+
+    # then, we'll print the most common ones using most_common(10)
+    if noun_counter is None:
+        pprint(noun_counts.most_common(10))
+    else:
+        print(format_top_k(noun_counts, 10))
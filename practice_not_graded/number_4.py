@@ -3,38 +3,27 @@ Build a binary classifier using Naive Bayes using this dataset. https://archive.
 
 Test the accuracy on 80-20 split.
 """
-import io
 from typing import Dict, List
-import zipfile
-import requests
 import os
+import sys
 import pandas as pd
 from sklearn.metrics import accuracy_score
 from sklearn.model_selection import train_test_split
 from sklearn.naive_bayes import GaussianNB, MultinomialNB
 
-# right-click 'Copy Link Address' on the Download button from link above
-zip_file_url: str = "https://archive.ics.uci.edu/static/public/53/iris.zip"
+# data_registry.py lives at the root of this repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data_registry import open_zip_member
 
-data_dir: str = "data/iris"
-
-if not os.path.exists(os.path.join(data_dir, "iris.data")):
-    response = requests.get(zip_file_url)
-
-    # Create a file-like object from the response content
-    zip_data = io.BytesIO(response.content)
-
-    # read from our file-like object holding the contents of 'iris.zip', and extract it into the data dir
-    # same as:
-    # > wget https://archive.ics.uci.edu/static/public/53/iris.zip
-    # > mkdir -p data/iris
-    # > unzip -d data/iris iris.zip 
-    os.makedirs(data_dir, exist_ok=True)
-    with zipfile.ZipFile(zip_data, 'r') as zip_ref:
-        zip_ref.extractall(data_dir)
+# right-click 'Copy Link Address' on the Download button from link above. The URL now lives in data_registry.DATASETS:
+# https://archive.ics.uci.edu/static/public/53/iris.zip
+# open_zip_member finds iris.zip in the cache (or the copy vendored in this repo, or downloads it), and reads iris.data
+# straight out of the zip, without extracting it to disk. Similar to:
+# > wget https://archive.ics.uci.edu/static/public/53/iris.zip
+# > unzip -p iris.zip iris.data
 
 # read in the data (its a CSV despite the name)
-df: pd.DataFrame = pd.read_csv(os.path.join(data_dir, "iris.data"), names=
+df: pd.DataFrame = pd.read_csv(open_zip_member("iris", "iris.data"), names=
                                 ["sepal_len", "sepal_wid", "petal_len", "petal_wid", "species"])
 
 # now we need to make this a binary classification problem somehow, despite 3 species. Wee'll do setosa vs. non-setosa
@@ -0,0 +1,339 @@
+"""
+Benchmark for the number_2 POS-counting implementations: the NLTK draft, the NLTK "optimized" version, the chunked
+parallel NLTK engine, the memoized NLTK version (tag_memo.py), the fast-path tagger (fast_perceptron.py), and spaCy
+(joined Doc and streaming).
+
+The number_2 scripts run everything at import time, so each one is re-written here as a function with the same steps,
+with each stage (tokenize, tag, count) timed separately. Each (variant, corpus size) run happens in a fresh process, so
+peak memory (max RSS) is measured for that run alone, and one run's caches don't speed up the next.
+
+For each run we record: wall time, tokens/sec, peak RSS, per-stage times, and the # NOUN / # ADJ it found. A run that
+crashes (e.g. a missing spaCy model) or takes longer than --timeout is recorded as failed, with the reason. The NLTK
+variants should all agree on NOUN and ADJ (the draft sums the NN* and JJ* Penn tags, which is what the universal
+tagset maps to NOUN and ADJ), and we check that they do. spaCy is a different tagger, so its counts are reported but
+not checked.
+
+> python pos_benchmark.py --scales 1 10 100 --variants nltk_draft nltk_optimized --output results/pos_benchmark
+"""
+import csv
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from queue import Empty
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# lazy_runtime.py lives at the root of this repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lazy_runtime import ensure_nltk, ensure_pos_tagging_resources, get_spacy_pipeline
+
+
+class StageTimer:
+    """
+    Records wall time per named stage: with timer.stage("tag"): ...
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.num_tokens: int = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+
+# a variant takes the tweets and a timer, and returns (# NOUN, # ADJ)
+Variant = Callable[[List[str], StageTimer], Tuple[int, int]]
+
+
+def run_nltk_draft(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # number_2_w_nltk_draft_1.py: pos_tag per tweet, Penn Treebank tags, manual Counter
+    from nltk import pos_tag, word_tokenize
+
+    with timer.stage("tokenize"):
+        tokenized_tweets: List[List[str]] = [word_tokenize(tweet) for tweet in tweets]
+    with timer.stage("tag"):
+        tagged_tweets: List[List[Tuple[str, str]]] = [pos_tag(tweet) for tweet in tokenized_tweets]
+    with timer.stage("count"):
+        pos_counter: Counter[str] = Counter()
+        for tweet in tagged_tweets:
+            for token, tag in tweet:
+                pos_counter[tag] += 1
+        noun_counter: Counter[str] = Counter()
+        for tweet in tagged_tweets:
+            for token, tag in tweet:
+                if tag.startswith('NN'):
+                    noun_counter[token] += 1
+        noun_counter.most_common(10)
+    timer.num_tokens = sum(pos_counter.values())
+    return (sum(count for tag, count in pos_counter.items() if tag.startswith('NN')),
+            sum(count for tag, count in pos_counter.items() if tag.startswith('JJ')))
+
+
+def run_nltk_optimized(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # number_2_w_nltk_optimized.py: pos_tag_sents, universal tagset, FreqDist
+    from nltk import FreqDist, pos_tag_sents, word_tokenize
+
+    with timer.stage("tokenize"):
+        tokenized_tweets: List[List[str]] = [word_tokenize(tweet) for tweet in tweets]
+    with timer.stage("tag"):
+        tagged_tweets: List[List[Tuple[str, str]]] = pos_tag_sents(tokenized_tweets, tagset='universal')
+    with timer.stage("count"):
+        pos_dist: FreqDist = FreqDist(samples=(tag for tweet in tagged_tweets for (token, tag) in tweet))
+        noun_dist: FreqDist = FreqDist(
+            samples=(token for tweet in tagged_tweets for (token, tag) in tweet if tag == 'NOUN'))
+        noun_dist.most_common(10)
+    timer.num_tokens = pos_dist.N()
+    return pos_dist['NOUN'], pos_dist['ADJ']
+
+
+def run_nltk_fast_tagger(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # number_2_w_nltk_optimized.py, with pos_tag_sents swapped for fast_perceptron.py's tagger (same weights and tags)
+    from nltk import FreqDist, word_tokenize
+
+    from fast_perceptron import FastPerceptronTagger
+
+    with timer.stage("load_model"):
+        tagger = FastPerceptronTagger(tagset='universal')
+    with timer.stage("tokenize"):
+        tokenized_tweets: List[List[str]] = [word_tokenize(tweet) for tweet in tweets]
+    with timer.stage("tag"):
+        tagged_tweets: List[List[Tuple[str, str]]] = tagger.tag_sents(tokenized_tweets)
+    with timer.stage("count"):
+        pos_dist: FreqDist = FreqDist(samples=(tag for tweet in tagged_tweets for (token, tag) in tweet))
+        noun_dist: FreqDist = FreqDist(
+            samples=(token for tweet in tagged_tweets for (token, tag) in tweet if tag == 'NOUN'))
+        noun_dist.most_common(10)
+    timer.num_tokens = pos_dist.N()
+    return pos_dist['NOUN'], pos_dist['ADJ']
+
+
+def run_nltk_parallel(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # number_2_w_nltk_parallel.py: tokenize + tag + count happen together in the workers, so there's only one stage
+    from number_2_w_nltk_parallel import parallel_pos_counts
+
+    with timer.stage("tokenize+tag+count"):
+        pos_dist, noun_dist = parallel_pos_counts(tweets)
+        noun_dist.most_common(10)
+    timer.num_tokens = pos_dist.N()
+    return pos_dist['NOUN'], pos_dist['ADJ']
+
+
+def run_nltk_memo(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # tag_memo.py: tokenize + tag each distinct text once (in-memory only, so every run starts cold)
+    from tag_memo import TagMemo
+
+    with timer.stage("tokenize+tag+count"):
+        memo = TagMemo()
+        pos_dist, noun_dist = memo.count_pos(tweets)
+        noun_dist.most_common(10)
+    timer.num_tokens = pos_dist.N()
+    return pos_dist['NOUN'], pos_dist['ADJ']
+
+
+def run_spacy_joined(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # number_2_w_spacy.py: one giant Doc. spaCy tokenizes and tags in one call, so those are one stage
+    with timer.stage("load_model"):
+        nlp = get_spacy_pipeline('en_core_web_sm', disable=('ner', 'parser'))
+    with timer.stage("tokenize+tag"):
+        all_tweets: str = "\n".join(tweets)
+        nlp.max_length = len(all_tweets) + 1
+        doc = nlp(all_tweets)
+    with timer.stage("count"):
+        pos_counts: Counter[str] = Counter(token.pos_ for token in doc)
+        Counter(str(token) for token in doc if token.pos_ == 'NOUN').most_common(10)
+    timer.num_tokens = len(doc)
+    return pos_counts['NOUN'], pos_counts['ADJ']
+
+
+def run_spacy_streaming(tweets: List[str], timer: StageTimer) -> Tuple[int, int]:
+    # number_2_w_spacy_streaming.py: nlp.pipe, counting each Doc as it arrives (so tag and count are interleaved)
+    from number_2_w_spacy_streaming import streaming_pos_counts
+
+    with timer.stage("load_model"):
+        nlp = get_spacy_pipeline('en_core_web_sm', disable=('ner', 'parser'))
+    with timer.stage("tokenize+tag+count"):
+        pos_counts, noun_counts = streaming_pos_counts(nlp, tweets)
+        noun_counts.most_common(10)
+    timer.num_tokens = sum(pos_counts.values())
+    return pos_counts['NOUN'], pos_counts['ADJ']
+
+
+VARIANTS: Dict[str, Variant] = {
+    "nltk_draft": run_nltk_draft,
+    "nltk_optimized": run_nltk_optimized,
+    "nltk_fast_tagger": run_nltk_fast_tagger,
+    "nltk_parallel": run_nltk_parallel,
+    "nltk_memo": run_nltk_memo,
+    "spacy_joined": run_spacy_joined,
+    "spacy_streaming": run_spacy_streaming,
+}
+NLTK_VARIANTS: Tuple[str, ...] = ("nltk_draft", "nltk_optimized", "nltk_fast_tagger", "nltk_parallel", "nltk_memo")
+
+
+def load_tweets(scale: int) -> List[str]:
+    from nltk.corpus import twitter_samples
+
+    # the same 20k tweets, replicated scale times, as a stand-in for a bigger corpus
+    return twitter_samples.strings("tweets.20150430-223406.json") * scale
+
+
+def _run_one(variant_name: str, scale: int, results: multiprocessing.Queue) -> None:
+    # runs in a fresh (spawned) process
+    tweets: List[str] = load_tweets(scale)
+    timer = StageTimer()
+    start: float = time.perf_counter()
+    num_nouns, num_adjs = VARIANTS[variant_name](tweets, timer)
+    wall_time_s: float = time.perf_counter() - start
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    # RUSAGE_CHILDREN covers this run's own worker processes (e.g. nltk_parallel's pool), once they've exited. It's the
+    # largest single worker, not the pool's total
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KB on Linux (but bytes on macOS)
+    rss_unit: int = 1024 if sys.platform != "darwin" else 2 ** 20
+    results.put({
+        "variant": variant_name,
+        "status": "ok",
+        "scale": scale,
+        "num_tweets": len(tweets),
+        "num_tokens": timer.num_tokens,
+        "wall_time_s": wall_time_s,
+        "tokens_per_s": timer.num_tokens / wall_time_s if wall_time_s > 0 else 0.0,
+        "peak_rss_mb": usage_self.ru_maxrss / rss_unit,
+        "peak_worker_rss_mb": usage_children.ru_maxrss / rss_unit,
+        "stage_seconds": timer.seconds,
+        "num_nouns": num_nouns,
+        "num_adjs": num_adjs,
+        "timestamp": time.time(),
+    })
+
+
+def _failed_result(variant_name: str, scale: int, error: str) -> Dict:
+    return {"variant": variant_name, "status": "failed", "error": error, "scale": scale, "num_tweets": None,
+            "num_tokens": None, "wall_time_s": None, "tokens_per_s": None, "peak_rss_mb": None,
+            "peak_worker_rss_mb": None, "stage_seconds": {}, "num_nouns": None, "num_adjs": None,
+            "timestamp": time.time()}
+
+
+def run_benchmark(variants: List[str], scales: List[int], timeout_s: float = 3600.0) -> List[Dict]:
+    """
+    Run every (variant, scale) in its own process. A run that crashes, or doesn't finish within timeout_s, is recorded
+    with status "failed" (and the reason in "error") instead of stopping (or hanging) the whole benchmark.
+    """
+    # spawn (not fork), so each run starts from a clean process and its peak RSS is its own
+    context = multiprocessing.get_context("spawn")
+    results: List[Dict] = []
+    for scale in scales:
+        for variant_name in variants:
+            queue: multiprocessing.Queue = context.Queue()
+            process = context.Process(target=_run_one, args=(variant_name, scale, queue))
+            process.start()
+            result: Optional[Dict] = None
+            deadline: float = time.perf_counter() + timeout_s
+            # poll, rather than block on queue.get(): if the child dies, nothing will ever be put on the queue
+            while result is None:
+                try:
+                    result = queue.get(timeout=1.0)
+                except Empty:
+                    if process.exitcode is not None:
+                        # the child may have put its result and exited right after the get above timed out, so
+                        # check the queue once more: only an exit with nothing on the queue is a failure
+                        try:
+                            result = queue.get(timeout=1.0)
+                        except Empty:
+                            result = _failed_result(variant_name, scale,
+                                                    f"process exited with code {process.exitcode}")
+                    elif time.perf_counter() > deadline:
+                        process.terminate()
+                        result = _failed_result(variant_name, scale, f"timed out after {timeout_s:.0f}s")
+            process.join()
+            if result["status"] == "ok":
+                print(f"{variant_name:<16} x{scale:<4} {result['wall_time_s']:8.2f}s  {result['tokens_per_s']:10.0f} "
+                      f"tok/s  {result['peak_rss_mb']:8.1f}MB  NOUN={result['num_nouns']} ADJ={result['num_adjs']}")
+            else:
+                print(f"{variant_name:<16} x{scale:<4} FAILED: {result['error']}")
+            results.append(result)
+    return results
+
+
+def check_agreement(results: List[Dict]) -> List[str]:
+    """
+    Returns a description of every (scale) where NLTK variants disagree on # NOUN or # ADJ. Empty means they agree.
+    """
+    problems: List[str] = []
+    for scale in sorted({result["scale"] for result in results}):
+        counts = {result["variant"]: (result["num_nouns"], result["num_adjs"]) for result in results
+                  if result["scale"] == scale and result["variant"] in NLTK_VARIANTS and result["status"] == "ok"}
+        if len(set(counts.values())) > 1:
+            problems.append(f"x{scale}: NLTK variants disagree on (# NOUN, # ADJ): {counts}")
+    return problems
+
+
+# CSV columns, in order. Stage columns (<stage>_s) come after these, one per stage seen across all runs
+RESULT_FIELDS: List[str] = ["timestamp", "variant", "status", "error", "scale", "num_tweets", "num_tokens",
+                            "wall_time_s", "tokens_per_s", "peak_rss_mb", "peak_worker_rss_mb", "num_nouns",
+                            "num_adjs"]
+
+
+def write_results(results: List[Dict], output_prefix: str) -> None:
+    """
+    Append this run's results to <prefix>.jsonl (one JSON object per run) and <prefix>.csv (one row per run, with one
+    column per stage), so they accumulate over time. The CSV header is written when the file is new. If a later run
+    has stages the existing header doesn't, they are only in the .jsonl.
+    """
+    os.makedirs(os.path.dirname(output_prefix) or ".", exist_ok=True)
+    with open(output_prefix + ".jsonl", "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    csv_path: str = output_prefix + ".csv"
+    if os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+        with open(csv_path, "r", newline="") as f:
+            fields: List[str] = next(csv.reader(f))
+        new_file: bool = False
+    else:
+        stages: List[str] = sorted({stage for result in results for stage in result["stage_seconds"]})
+        fields = RESULT_FIELDS + [f"{stage}_s" for stage in stages]
+        new_file = True
+    with open(csv_path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        for result in results:
+            row: Dict = {key: value for key, value in result.items() if key != "stage_seconds"}
+            row.update({f"{stage}_s": seconds for stage, seconds in result["stage_seconds"].items()})
+            writer.writerow(row)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the number_2 POS counting implementations")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(NLTK_VARIANTS))
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10],
+                        help="how many copies of the tweets file to process, e.g. 1 10 100")
+    parser.add_argument("--output", default="pos_benchmark_results",
+                        help="appends to <output>.jsonl and <output>.csv")
+    parser.add_argument("--timeout", type=float, default=3600.0, help="seconds before a run is recorded as failed")
+    args = parser.parse_args()
+
+    # download anything missing once, up front, rather than in (and timed as part of) every run
+    ensure_nltk("twitter_samples")
+    ensure_pos_tagging_resources()
+
+    benchmark_results: List[Dict] = run_benchmark(args.variants, args.scales, timeout_s=args.timeout)
+    write_results(benchmark_results, args.output)
+
+    disagreements: List[str] = check_agreement(benchmark_results)
+    for problem in disagreements:
+        print(problem)
+    if not disagreements:
+        print("NLTK variants agree on # NOUN and # ADJ")
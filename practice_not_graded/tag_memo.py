@@ -0,0 +1,239 @@
+"""
+Memoized tokenize + tag for number_2_w_nltk_optimized.py: each distinct tweet text is tokenized and tagged only once.
+
+The twitter corpus (and real feeds even more so) has lots of retweets and copy-pasted texts, and
+number_2_w_nltk_optimized.py runs word_tokenize and pos_tag_sents on every copy. Here, tweets are first grouped by a hash
+of their text. Only texts we haven't seen before are tagged, then each text's counts are added once per copy. The
+perceptron tagger tags each tweet on its own (no context from neighboring tweets), so the counts are exactly the same as
+tagging every copy.
+
+Results are remembered in an in-process LRU (max_entries texts), and optionally in an on-disk SQLite store, so a later
+run (or another process) can skip the tagging entirely. Keys include the tagger version and tagset, so upgrading NLTK
+or switching tagsets never returns stale tags. Texts are only stripped of leading/trailing whitespace before hashing:
+anything more (unicode normalization, lowercasing, dropping URLs, ...) would let texts the tagger sees differently
+share one key, and every copy would get the tokens of whichever copy was tagged first.
+
+> memo = TagMemo(store_path="tag_memo.sqlite")
+> pos_dist, noun_dist = memo.count_pos(tweets)
+> print(memo.stats)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from nltk import FreqDist
+
+TaggedTweet = List[Tuple[str, str]]
+
+
+def normalize_text(text: str) -> str:
+    # word_tokenize ignores leading/trailing whitespace, so texts that differ only in that get the same tokens and tags.
+    # Not NFC: word_tokenize keeps tokens' characters as they are, so e.g. a composed and a decomposed "café" are
+    # different tokens, and must not share a key
+    return text.strip()
+
+
+def default_tagger_version() -> str:
+    """
+    Identifies the tagger weights pos_tag uses, for the memo key: the NLTK version and the weights' package name.
+    """
+    import nltk
+    from nltk.tag import PerceptronTagger
+
+    # NLTK 3.9+ loads the weights from averaged_perceptron_tagger_eng (see lazy_runtime.get_perceptron_tagger)
+    package: str = "averaged_perceptron_tagger_eng" if hasattr(PerceptronTagger, "load_from_json") \
+        else "averaged_perceptron_tagger"
+    return f"nltk-{nltk.__version__}/{package}"
+
+
+@dataclass
+class MemoStats:
+    tweets: int = 0
+    # tweets that were a repeat of an earlier tweet in the same call
+    repeats: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    # distinct texts that had to be tokenized and tagged
+    tagged: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of tweets that didn't need to be tagged.
+        """
+        return 1 - self.tagged / self.tweets if self.tweets else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.tweets} tweets: {self.tagged} tagged, {self.repeats} repeats, {self.memory_hits} memory hits, "
+                f"{self.disk_hits} disk hits (hit rate {self.hit_rate:.1%})")
+
+
+class TagMemo:
+
+    def __init__(self, max_entries: int = 100_000, store_path: Optional[str] = None, tagset: Optional[str] = 'universal',
+                 tagger_version: Optional[str] = None,
+                 tokenize: Optional[Callable[[str], List[str]]] = None,
+                 tag_sents: Optional[Callable[[List[List[str]]], List[TaggedTweet]]] = None):
+        """
+        :param max_entries: number of distinct texts kept in memory, least recently used are dropped first
+        :param store_path: optional SQLite file to also keep results in, across runs and processes
+        :param tagset: passed to pos_tag_sents, and part of the key
+        :param tagger_version: part of the key, defaults to default_tagger_version(). Pass your own if you pass your own
+            tokenize/tag_sents
+        :param tokenize: defaults to nltk.word_tokenize
+        :param tag_sents: defaults to nltk.pos_tag_sents(..., tagset=tagset)
+        """
+        if tokenize is None or tag_sents is None:
+            from nltk import pos_tag_sents, word_tokenize
+            tokenize = tokenize or word_tokenize
+            tag_sents = tag_sents or partial(pos_tag_sents, tagset=tagset)
+        self.tokenize: Callable[[str], List[str]] = tokenize
+        self.tag_sents: Callable[[List[List[str]]], List[TaggedTweet]] = tag_sents
+        self.max_entries: int = max_entries
+        self.key_prefix: bytes = f"{tagger_version or default_tagger_version()}\0{tagset}\0".encode("utf-8")
+        self.stats = MemoStats()
+        self._lru: "OrderedDict[bytes, TaggedTweet]" = OrderedDict()
+        self._store: Optional[sqlite3.Connection] = None
+        if store_path is not None:
+            self._store = sqlite3.connect(os.path.expanduser(store_path))
+            self._store.execute("CREATE TABLE IF NOT EXISTS memo (key BLOB PRIMARY KEY, tagged TEXT NOT NULL)")
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(self.key_prefix + normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+    def _remember(self, key: bytes, tagged: TaggedTweet) -> None:
+        self._lru[key] = tagged
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _load_from_store(self, keys: List[bytes]) -> Dict[bytes, TaggedTweet]:
+        found: Dict[bytes, TaggedTweet] = {}
+        # SQLite limits the number of ? in one query, so look keys up in batches
+        for start in range(0, len(keys), 500):
+            batch: List[bytes] = keys[start:start + 500]
+            rows = self._store.execute(f"SELECT key, tagged FROM memo WHERE key IN ({','.join('?' * len(batch))})",
+                                       batch)
+            for key, tagged in rows:
+                found[key] = [tuple(pair) for pair in json.loads(tagged)]
+        return found
+
+    def _save_to_store(self, results: Dict[bytes, TaggedTweet]) -> None:
+        with self._store:
+            self._store.executemany("INSERT OR REPLACE INTO memo (key, tagged) VALUES (?, ?)",
+                                    [(key, json.dumps(tagged)) for key, tagged in results.items()])
+
+    def tag_unique(self, tweets: Iterable[str]) -> List[Tuple[TaggedTweet, int]]:
+        """
+        (tagged tweet, number of copies) for each distinct text in tweets, in order of first appearance.
+        """
+        multiplicity: Dict[bytes, int] = {}
+        texts: Dict[bytes, str] = {}
+        for tweet in tweets:
+            key: bytes = self.key(tweet)
+            if key in multiplicity:
+                multiplicity[key] += 1
+            else:
+                multiplicity[key] = 1
+                texts[key] = tweet
+        num_tweets: int = sum(multiplicity.values())
+        self.stats.tweets += num_tweets
+        self.stats.repeats += num_tweets - len(multiplicity)
+
+        results: Dict[bytes, TaggedTweet] = {}
+        for key in multiplicity:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                results[key] = self._lru[key]
+        self.stats.memory_hits += len(results)
+
+        missing: List[bytes] = [key for key in multiplicity if key not in results]
+        if missing and self._store is not None:
+            from_store: Dict[bytes, TaggedTweet] = self._load_from_store(missing)
+            self.stats.disk_hits += len(from_store)
+            results.update(from_store)
+            missing = [key for key in missing if key not in from_store]
+
+        if missing:
+            # one pos_tag_sents call for everything new, like number_2_w_nltk_optimized.py does
+            tagged_tweets: List[TaggedTweet] = self.tag_sents([self.tokenize(texts[key]) for key in missing])
+            new_results: Dict[bytes, TaggedTweet] = dict(zip(missing, tagged_tweets))
+            self.stats.tagged += len(new_results)
+            results.update(new_results)
+            if self._store is not None:
+                self._save_to_store(new_results)
+
+        for key, tagged in results.items():
+            self._remember(key, tagged)
+        # dicts keep insertion order, so this is the order each text first appeared in
+        return [(results[key], count) for key, count in multiplicity.items()]
+
+    def count_pos(self, tweets: Iterable[str]) -> Tuple[FreqDist, FreqDist]:
+        """
+        The same (pos_dist, noun_dist) as number_2_w_nltk_optimized.py, tagging each distinct text once.
+
+        Distinct texts are counted in order of first appearance, so every tag and noun is first seen in the same order
+        as in the script, and most_common() breaks ties the same way.
+        """
+        pos_dist: FreqDist = FreqDist()
+        noun_dist: FreqDist = FreqDist()
+        for tagged, count in self.tag_unique(tweets):
+            for token, tag in tagged:
+                pos_dist[tag] += count
+                if tag == 'NOUN':
+                    noun_dist[token] += count
+        return pos_dist, noun_dist
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+    from pprint import pprint
+
+    from nltk import pos_tag_sents, word_tokenize
+    from nltk.corpus import twitter_samples
+
+    # lazy_runtime.py lives at the root of this repo
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from lazy_runtime import ensure_nltk, ensure_pos_tagging_resources
+
+    parser = argparse.ArgumentParser(description="Memoized NLTK POS counts over the NLTK twitter corpus")
+    parser.add_argument("--store", default=None, help="SQLite file to keep tags in across runs")
+    parser.add_argument("--check", action="store_true", help="also tag every tweet without the memo, and compare")
+    args = parser.parse_args()
+
+    ensure_nltk('twitter_samples')
+    # the tagger and tokenizer models, under the resource names this NLTK version uses (they changed in 3.9)
+    ensure_pos_tagging_resources()
+
+    # load the tweets in file "tweets.20150430-223406.json"
+    tweets: List[str] = twitter_samples.strings("tweets.20150430-223406.json")
+
+    memo = TagMemo(store_path=args.store)
+    start: float = time.perf_counter()
+    pos_dist, noun_dist = memo.count_pos(tweets)
+    print(f"memoized: {time.perf_counter() - start:.2f}s, {memo.stats}")
+    print(f"# NOUN: {pos_dist['NOUN']}, # ADJ: {pos_dist['ADJ']}")
+    pprint(noun_dist.most_common(10))
+
+    if args.check:
+        start = time.perf_counter()
+        tagged_tweets: Sequence[TaggedTweet] = pos_tag_sents([word_tokenize(tweet) for tweet in tweets], tagset='universal')
+        print(f"not memoized: {time.perf_counter() - start:.2f}s")
+        expected_pos: FreqDist = FreqDist(tag for tweet in tagged_tweets for (token, tag) in tweet)
+        expected_nouns: FreqDist = FreqDist(token for tweet in tagged_tweets for (token, tag) in tweet if tag == 'NOUN')
+        assert expected_pos == pos_dist and expected_nouns == noun_dist
+        assert expected_nouns.most_common(10) == noun_dist.most_common(10)
+        print("counts match")
+    memo.close()
@@ -0,0 +1,307 @@
+"""
+A compiled, memory-mapped token corpus for the number_2 analyses: tokenize (and optionally tag) once, then re-analyze
+from flat NumPy arrays.
+
+Every number_2 script re-reads the tweets JSON and re-tokenizes it, and the result (List[List[str]], plus a tuple per
+(token, tag)) is millions of small Python objects. Compiled, a corpus is a directory with:
+- tokens.npy: uint32 token ids, every tweet's tokens one after another
+- offsets.npy: int64, tweet i is tokens[offsets[i]:offsets[i + 1]]
+- tags.npy (optional): uint8 POS tag ids, one per token
+- vocab.json: the token strings (id -> token), the tag names, and which backend (nltk or spacy) tokenized / tagged the
+  corpus, and how
+
+Loading memory-maps the arrays, so it takes milliseconds regardless of corpus size, pages are read on demand, and
+processes analyzing the same corpus share them. Per-tweet slices are views (no copies), and counts are np.bincount over
+the whole array instead of a Python loop. Both NLTK (compile_nltk) and spaCy (compile_spacy) can write a corpus; the
+analyses don't care which did, but is_compiled(directory, backend) does, so a corpus isn't re-used for the other one.
+
+A corpus is written to a temporary directory next to its final one, and only moved into place once complete, so an
+interrupted build never leaves a mix of old and new files behind, and processes that have the old one memory-mapped
+keep reading the old files.
+
+> corpus = compile_nltk(tweets, "corpora/tweets_nltk", tagset="universal")    # once
+> corpus = TokenCorpus.load("corpora/tweets_nltk")                           # every run after that
+> print(corpus.tag_counts()["NOUN"], corpus.most_common(10, tag="NOUN"))
+"""
+import json
+import os
+import shutil
+import tempfile
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# bump this if the layout changes, so old corpora are rebuilt instead of misread
+CORPUS_FORMAT_VERSION: int = 2
+
+
+class CorpusWriter:
+    """
+    Builds a corpus one tweet at a time. Token and tag ids go into compact typed arrays as they arrive, so the strings
+    of each tweet can be freed right away.
+    """
+
+    def __init__(self, directory: str, backend: str, source: str):
+        """
+        :param backend: "nltk" or "spacy", checked by is_compiled
+        :param source: a description of what tokenized / tagged the corpus, e.g. with versions
+        """
+        self.directory: str = directory
+        self.backend: str = backend
+        self.source: str = source
+        self.vocab: List[str] = []
+        self.token_to_id: Dict[str, int] = {}
+        self.tag_names: List[str] = []
+        self.tag_to_id: Dict[str, int] = {}
+        self.tokens: array = array('I')
+        self.tags: array = array('B')
+        self.offsets: array = array('q', [0])
+
+    def _token_id(self, token: str) -> int:
+        token_id: Optional[int] = self.token_to_id.get(token)
+        if token_id is None:
+            token_id = self.token_to_id[token] = len(self.vocab)
+            self.vocab.append(token)
+        return token_id
+
+    def _tag_id(self, tag: str) -> int:
+        tag_id: Optional[int] = self.tag_to_id.get(tag)
+        if tag_id is None:
+            if len(self.tag_names) == 256:
+                raise ValueError("tags are stored as uint8, so a corpus can have at most 256 distinct tags")
+            tag_id = self.tag_to_id[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+        return tag_id
+
+    def add(self, tokens: Sequence[str], tags: Optional[Sequence[str]] = None) -> None:
+        if tags is None and len(self.tags):
+            raise ValueError("either every tweet has tags, or none do")
+        self.tokens.extend(self._token_id(token) for token in tokens)
+        if tags is not None:
+            if len(tags) != len(tokens):
+                raise ValueError(f"got {len(tags)} tags for {len(tokens)} tokens")
+            if len(self.tags) != len(self.tokens) - len(tokens):
+                raise ValueError("either every tweet has tags, or none do")
+            self.tags.extend(self._tag_id(tag) for tag in tags)
+        self.offsets.append(len(self.tokens))
+
+    def close(self) -> "TokenCorpus":
+        directory: str = os.path.abspath(self.directory)
+        parent: str = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        # build next to the final directory (same filesystem, so the renames below are atomic)
+        build_dir: str = tempfile.mkdtemp(prefix=os.path.basename(directory) + ".build-", dir=parent)
+        try:
+            np.save(os.path.join(build_dir, "tokens.npy"), np.frombuffer(self.tokens, dtype=np.uint32))
+            np.save(os.path.join(build_dir, "offsets.npy"), np.frombuffer(self.offsets, dtype=np.int64))
+            if self.tag_names:
+                np.save(os.path.join(build_dir, "tags.npy"), np.frombuffer(self.tags, dtype=np.uint8))
+            with open(os.path.join(build_dir, "vocab.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": CORPUS_FORMAT_VERSION, "backend": self.backend, "source": self.source,
+                           "vocab": self.vocab, "tags": self.tag_names}, f)
+            # a directory can't be os.replace'd over a non-empty one, so move the old corpus aside first. Its files are
+            # only unlinked, so memory-maps of them stay valid
+            old_dir: Optional[str] = None
+            if os.path.exists(directory):
+                old_dir = tempfile.mkdtemp(prefix=os.path.basename(directory) + ".old-", dir=parent)
+                os.replace(directory, os.path.join(old_dir, "corpus"))
+            os.replace(build_dir, directory)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        return TokenCorpus.load(directory)
+
+
+class TokenCorpus:
+
+    def __init__(self, vocab: List[str], tokens: np.ndarray, offsets: np.ndarray, tags: Optional[np.ndarray] = None,
+                 tag_names: Optional[List[str]] = None, backend: str = "", source: str = ""):
+        self.vocab: List[str] = vocab
+        self.tokens: np.ndarray = tokens
+        self.offsets: np.ndarray = offsets
+        self.tags: Optional[np.ndarray] = tags
+        self.tag_names: List[str] = tag_names or []
+        self.backend: str = backend
+        self.source: str = source
+        self._token_to_id: Optional[Dict[str, int]] = None
+
+    @staticmethod
+    def is_compiled(directory: str, backend: Optional[str] = None) -> bool:
+        """
+        Whether directory holds a complete corpus in the current format, written by backend ("nltk" or "spacy") if
+        one is given.
+        """
+        path: str = os.path.join(directory, "vocab.json")
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state.get("version") == CORPUS_FORMAT_VERSION and (backend is None or state.get("backend") == backend)
+
+    @classmethod
+    def load(cls, directory: str) -> "TokenCorpus":
+        with open(os.path.join(directory, "vocab.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        # mmap_mode='r': pages are read from disk on demand and shared between processes, not copied into memory
+        tags_path: str = os.path.join(directory, "tags.npy")
+        return cls(state["vocab"], np.load(os.path.join(directory, "tokens.npy"), mmap_mode="r"),
+                   np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r"),
+                   np.load(tags_path, mmap_mode="r") if os.path.exists(tags_path) else None,
+                   state["tags"], state["backend"], state["source"])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_tokens(self) -> int:
+        return len(self.tokens)
+
+    def token_id(self, token: str) -> Optional[int]:
+        # built on first use: most analyses only ever go from ids to strings
+        if self._token_to_id is None:
+            self._token_to_id = {token_: token_id for token_id, token_ in enumerate(self.vocab)}
+        return self._token_to_id.get(token)
+
+    def doc_ids(self, i: int) -> np.ndarray:
+        """
+        Token ids of tweet i. A view into the memory-mapped array, nothing is copied.
+        """
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def doc(self, i: int) -> List[str]:
+        return [self.vocab[token_id] for token_id in self.doc_ids(i)]
+
+    def doc_tagged(self, i: int) -> List[Tuple[str, str]]:
+        """
+        Tweet i as (token, tag) pairs, like one element of pos_tag_sents' output.
+        """
+        if self.tags is None:
+            raise ValueError("this corpus was compiled without tags")
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return [(self.vocab[token_id], self.tag_names[tag_id])
+                for token_id, tag_id in zip(self.tokens[start:end], self.tags[start:end])]
+
+    def _tag_mask(self, tag: str) -> np.ndarray:
+        if self.tags is None:
+            raise ValueError("this corpus was compiled without tags")
+        if tag not in self.tag_names:
+            return np.zeros(len(self.tokens), dtype=bool)
+        return self.tags == self.tag_names.index(tag)
+
+    def unigram_counts(self, tag: Optional[str] = None) -> np.ndarray:
+        """
+        Count of each token id (optionally only where it was tagged tag), as an array indexed by id.
+        """
+        tokens: np.ndarray = self.tokens if tag is None else self.tokens[self._tag_mask(tag)]
+        return np.bincount(tokens, minlength=len(self.vocab))
+
+    def tag_counts(self) -> Dict[str, int]:
+        if self.tags is None:
+            raise ValueError("this corpus was compiled without tags")
+        counts: np.ndarray = np.bincount(self.tags, minlength=len(self.tag_names))
+        return {tag: int(count) for tag, count in zip(self.tag_names, counts)}
+
+    def most_common(self, k: int = 10, tag: Optional[str] = None) -> List[Tuple[str, int]]:
+        """
+        The k most common tokens (optionally only those tagged tag), like Counter.most_common(k).
+
+        Ties are broken by where the token first occurs (among tokens with that tag), which is the order a Counter
+        built over the tweets would have seen them in, so this returns exactly what the number_2 scripts' most_common
+        does.
+        """
+        tokens: np.ndarray = self.tokens if tag is None else self.tokens[self._tag_mask(tag)]
+        token_ids, first_position, counts = np.unique(tokens, return_index=True, return_counts=True)
+        # lexsort sorts by the last key first: highest count, then earliest first occurrence
+        order: np.ndarray = np.lexsort((first_position, -counts))[:k]
+        return [(self.vocab[token_ids[i]], int(counts[i])) for i in order]
+
+
+def compile_nltk(tweets: Iterable[str], directory: str, tagset: Optional[str] = 'universal', tag: bool = True,
+                 chunk_size: int = 2000) -> TokenCorpus:
+    """
+    Tokenize tweets with word_tokenize and (if tag) tag them with pos_tag_sents(..., tagset=tagset), like
+    number_2_w_nltk_optimized.py, and write the result to directory. Works chunk by chunk, so only one chunk's worth
+    of strings is ever in memory.
+    """
+    import nltk
+    from nltk import pos_tag_sents, word_tokenize
+
+    writer = CorpusWriter(directory, backend="nltk", source=f"nltk-{nltk.__version__} word_tokenize" +
+                                                            (f" + pos_tag_sents(tagset={tagset})" if tag else ""))
+    chunk: List[str] = []
+
+    def flush() -> None:
+        tokenized_tweets: List[List[str]] = [word_tokenize(tweet) for tweet in chunk]
+        if not tag:
+            for tokens in tokenized_tweets:
+                writer.add(tokens)
+            return
+        for tagged in pos_tag_sents(tokenized_tweets, tagset=tagset):
+            writer.add([token for token, _ in tagged], [tag_ for _, tag_ in tagged])
+
+    for tweet in tweets:
+        chunk.append(tweet)
+        if len(chunk) == chunk_size:
+            flush()
+            chunk = []
+    if chunk:
+        flush()
+    return writer.close()
+
+
+def compile_spacy(nlp, tweets: Iterable[str], directory: str, batch_size: int = 256) -> TokenCorpus:
+    """
+    Tokenize and tag tweets with a spaCy pipeline, streaming them through nlp.pipe like
+    number_2_w_spacy_streaming.py, and write the result (with coarse token.pos_ tags) to directory.
+    """
+    writer = CorpusWriter(directory, backend="spacy",
+                          source=f"spacy {nlp.meta.get('name', '')}-{nlp.meta.get('version', '')} pos_")
+    for doc in nlp.pipe(tweets, batch_size=batch_size):
+        writer.add([str(token) for token in doc], [token.pos_ for token in doc])
+    return writer.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+    from pprint import pprint
+
+    # lazy_runtime.py lives at the root of this repo
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from lazy_runtime import ensure_nltk, ensure_pos_tagging_resources, get_spacy_pipeline
+
+    parser = argparse.ArgumentParser(description="Compile the twitter corpus once, then analyze it from memory-maps")
+    parser.add_argument("--directory", default=None, help="defaults to corpora/tweets_<backend>")
+    parser.add_argument("--backend", choices=["nltk", "spacy"], default="nltk")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+    directory: str = args.directory or os.path.join("corpora", f"tweets_{args.backend}")
+
+    # a corpus compiled by the other backend is rebuilt, not re-used
+    if args.rebuild or not TokenCorpus.is_compiled(directory, backend=args.backend):
+        from nltk.corpus import twitter_samples
+
+        ensure_nltk('twitter_samples')
+        # load the tweets in file "tweets.20150430-223406.json"
+        tweets: List[str] = twitter_samples.strings("tweets.20150430-223406.json")
+        start: float = time.perf_counter()
+        if args.backend == "nltk":
+            # the tagger and tokenizer models, under the resource names this NLTK version uses (they changed in 3.9)
+            ensure_pos_tagging_resources()
+            compile_nltk(tweets, directory)
+        else:
+            compile_spacy(get_spacy_pipeline('en_core_web_sm', disable=('ner', 'parser')), tweets, directory)
+        print(f"compiled in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    corpus: TokenCorpus = TokenCorpus.load(directory)
+    tag_counts: Dict[str, int] = corpus.tag_counts()
+    top_nouns: List[Tuple[str, int]] = corpus.most_common(10, tag='NOUN')
+    print(f"loaded + analyzed {len(corpus)} tweets, {corpus.num_tokens} tokens ({corpus.source}) in "
+          f"{(time.perf_counter() - start) * 1000:.1f}ms")
+    print(f"# NOUN: {tag_counts.get('NOUN', 0)}, # ADJ: {tag_counts.get('ADJ', 0)}")
+    pprint(top_nouns)
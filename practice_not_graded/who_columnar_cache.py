@@ -0,0 +1,160 @@
+"""
+A typed, columnar (Parquet) cache for the WHO life-expectancy data in number-1-data-text.csv.
+
+Every run of number_1.py re-parses the CSV as text: pandas re-infers the dtype of every column, and stores repeated
+strings like Indicator or Country as one Python object per row. Here, we convert the CSV once into a Parquet file with:
+- explicit numeric dtypes for Year, Numeric, Low and High
+- categorical (dictionary) encoding for the low-cardinality string columns, so each distinct string is stored once
+
+Later loads read the Parquet file memory-mapped, and can ask for only some columns (projection) and only some rows
+(predicate pushdown: pyarrow skips row groups whose min/max statistics can't match, before decoding them).
+
+The cache records the size and modification time of the CSV it was built from. If the CSV has changed (or pyarrow
+isn't installed), we fall back to reading the CSV, and rebuild the cache when we can.
+
+> df = load_who_data(columns=["Country", "Year", "Numeric"], filters=[("Year", ">=", 2000), ("Sex", "==", "Both sexes")])
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+MY_FILE_NAME: str = "number-1-data-text.csv"
+CACHE_FILE_NAME: str = "number-1-data-text.parquet"
+
+# bump this if the dtypes below change, so existing caches are rebuilt
+CACHE_VERSION: str = "1"
+
+CATEGORICAL_COLUMNS: List[str] = ["Indicator", "PUBLISH STATES", "WHO region", "World Bank income group", "Country",
+                                  "Sex"]
+DTYPES: Dict[str, Any] = {
+    **{column: "category" for column in CATEGORICAL_COLUMNS},
+    "Year": "int16",
+    # Display Value is usually a number, but WHO files sometimes write ranges like "77 [70-80]" here, so keep it a string
+    "Display Value": "string",
+    "Numeric": "float64",
+    "Low": "float64",
+    "High": "float64",
+    "Comments": "string",
+}
+
+# pyarrow-style filters: a list of (column, op, value), all of which must hold. op is one of
+# ==, !=, <, <=, >, >=, in, not in
+Filters = List[Tuple[str, str, Any]]
+
+
+def _source_fingerprint(csv_path: str) -> Dict[bytes, bytes]:
+    stat = os.stat(csv_path)
+    return {b"who_cache_version": CACHE_VERSION.encode(), b"source_size": str(stat.st_size).encode(),
+            b"source_mtime_ns": str(stat.st_mtime_ns).encode()}
+
+
+def read_csv_typed(csv_path: str = MY_FILE_NAME, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.read_csv(csv_path, usecols=columns,
+                       dtype={column: dtype for column, dtype in DTYPES.items() if columns is None or column in columns})
+
+
+def build_cache(csv_path: str = MY_FILE_NAME, cache_path: str = CACHE_FILE_NAME, row_group_size: int = 100_000) -> None:
+    """
+    Convert the CSV into a Parquet cache. Written to a temporary file first and renamed, so readers never see a
+    partially written cache.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table: pa.Table = pa.Table.from_pandas(read_csv_typed(csv_path), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **_source_fingerprint(csv_path)})
+    tmp_path: str = cache_path + ".tmp"
+    # sorting isn't needed for correctness, but smaller row groups + statistics are what let filters skip data
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, use_dictionary=True, write_statistics=True)
+    os.replace(tmp_path, cache_path)
+
+
+def cache_is_fresh(csv_path: str = MY_FILE_NAME, cache_path: str = CACHE_FILE_NAME) -> bool:
+    if not os.path.exists(cache_path):
+        return False
+    import pyarrow.parquet as pq
+
+    metadata: Dict[bytes, bytes] = pq.read_schema(cache_path).metadata or {}
+    return all(metadata.get(key) == value for key, value in _source_fingerprint(csv_path).items())
+
+
+def _apply_filters(df: pd.DataFrame, filters: Filters) -> pd.DataFrame:
+    """
+    The same filters pyarrow would push down, applied to an in-memory DataFrame (for the CSV fallback).
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        values: pd.Series = df[column]
+        if op in ("==", "="):
+            mask &= values == value
+        elif op == "!=":
+            mask &= values != value
+        elif op == "<":
+            mask &= values < value
+        elif op == "<=":
+            mask &= values <= value
+        elif op == ">":
+            mask &= values > value
+        elif op == ">=":
+            mask &= values >= value
+        elif op == "in":
+            mask &= values.isin(value)
+        elif op == "not in":
+            mask &= ~values.isin(value)
+        else:
+            raise ValueError(f"unsupported filter op: {op}")
+    return df[mask].reset_index(drop=True)
+
+
+def load_who_data(columns: Optional[List[str]] = None, filters: Optional[Filters] = None,
+                  csv_path: str = MY_FILE_NAME, cache_path: str = CACHE_FILE_NAME) -> pd.DataFrame:
+    """
+    Load the WHO data from the columnar cache, building or rebuilding it first if needed.
+
+    :param columns: only load these columns (default: all)
+    :param filters: only load rows matching all of these, e.g. [("Year", ">=", 2000), ("Sex", "==", "Both sexes")]
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+    if pq is not None:
+        if not cache_is_fresh(csv_path, cache_path):
+            build_cache(csv_path, cache_path)
+        # filter columns must be read to evaluate the filter, but are dropped again if they weren't asked for
+        read_columns: Optional[List[str]] = None if columns is None \
+            else list(dict.fromkeys(columns + [column for column, _, _ in filters or []]))
+        table = pq.read_table(cache_path, columns=read_columns, filters=filters or None, memory_map=True)
+        df: pd.DataFrame = table.to_pandas()
+        return df if columns is None else df[columns]
+
+    # fallback: no pyarrow, so parse the CSV (with the same dtypes)
+    read_columns = None if columns is None \
+        else list(dict.fromkeys(columns + [column for column, _, _ in filters or []]))
+    df = read_csv_typed(csv_path, columns=read_columns)
+    if filters:
+        df = _apply_filters(df, filters)
+    return df if columns is None else df[columns]
+
+
+if __name__ == '__main__':
+    import time
+
+    start: float = time.perf_counter()
+    csv_df: pd.DataFrame = pd.read_csv(MY_FILE_NAME)
+    print(f"pd.read_csv: {(time.perf_counter() - start) * 1000:.1f}ms, "
+          f"{csv_df.memory_usage(deep=True).sum() / 1024:.0f}KB")
+
+    # first call builds the cache if it's missing or stale
+    load_who_data()
+
+    start = time.perf_counter()
+    df: pd.DataFrame = load_who_data()
+    print(f"load_who_data: {(time.perf_counter() - start) * 1000:.1f}ms, {df.memory_usage(deep=True).sum() / 1024:.0f}KB")
+
+    start = time.perf_counter()
+    recent: pd.DataFrame = load_who_data(columns=["Country", "Year", "Numeric"],
+                                         filters=[("Year", ">=", 2000), ("Sex", "==", "Both sexes")])
+    print(f"load_who_data (projected + filtered): {(time.perf_counter() - start) * 1000:.1f}ms, {len(recent)} rows")
+    print(recent.head())
@@ -0,0 +1,134 @@
+"""
+Counting values in a Hugging Face dataset column, without building a Python dict per row.
+
+In counter_example.py, `for item in dataset` turns every row into a dict of *all* its columns (including the full
+newsgroup text!) just so we can read item['label_text']. Datasets are stored as Arrow tables, so we can instead:
+1) project just the column we want, in Arrow format
+2) count values a batch at a time with pyarrow.compute.value_counts (in C, no per-row Python objects)
+3) merge the per-batch counts into one Counter
+
+With num_proc > 1, batches are counted in parallel with Dataset.map(batched=True, num_proc=...) instead, and the partial
+counts are merged at the end. Either way, the result is the same Counter as counter_example.py builds.
+
+> label_counter: Counter[str] = count_column(load_dataset("SetFit/20_newsgroups", split="train"), "label_text")
+"""
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from datasets import Dataset, DatasetDict
+
+DEFAULT_BATCH_SIZE: int = 100_000
+
+
+def _value_counts(array: pa.Array) -> Counter:
+    counts: Counter = Counter()
+    # value_counts returns a struct array of {values, counts}
+    for entry in pc.value_counts(array).to_pylist():
+        counts[entry["values"]] += entry["counts"]
+    return counts
+
+
+def _count_batch(batch: pa.Table, column: str) -> Dict[str, List[Any]]:
+    # used with Dataset.map: each batch becomes a few (value, count) rows instead of one row per item
+    value_counts: pa.StructArray = pc.value_counts(batch[column])
+    return {"value": value_counts.field("values").to_pylist(), "count": value_counts.field("counts").to_pylist()}
+
+
+def count_column(dataset: Dataset, column: str, num_proc: Optional[int] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Counter:
+    """
+    Count the values of one column of a dataset.
+
+    :param dataset: any Dataset, e.g. one split from load_dataset
+    :param column: the column to count, e.g. 'label_text'
+    :param num_proc: if more than 1, count batches in this many processes with Dataset.map
+    :param batch_size: rows per batch. Only this many values of the column are materialized at a time
+    """
+    if column not in dataset.column_names:
+        raise KeyError(f"column {column!r} not in dataset, which has columns {dataset.column_names}")
+    # select_columns is a projection: other columns (like the text) are never read
+    projected: Dataset = dataset.select_columns([column]).with_format("arrow")
+    if not num_proc or num_proc <= 1:
+        counts: Counter = Counter()
+        for batch in projected.iter(batch_size=batch_size):
+            counts.update(_value_counts(batch[column]))
+        return counts
+
+    partials: Dataset = projected.map(_count_batch, batched=True, batch_size=batch_size, num_proc=num_proc,
+                                      fn_kwargs={"column": column}, remove_columns=[column], keep_in_memory=True)
+    counts = Counter()
+    # partials is small: at most (number of distinct values) rows per batch
+    for value, count in zip(partials["value"].to_pylist(), partials["count"].to_pylist()):
+        counts[value] += count
+    return counts
+
+
+def count_splits(dataset_dict: DatasetDict, column: str, num_proc: Optional[int] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Counter]:
+    """
+    count_column for every split, e.g. count_splits(load_dataset("SetFit/20_newsgroups"), "label_text")['test']
+    """
+    return {split: count_column(dataset, column, num_proc=num_proc, batch_size=batch_size)
+            for split, dataset in dataset_dict.items()}
+
+
+class IncrementalColumnCounter:
+    """
+    Keeps running counts for one column as new shards of a dataset arrive. Each shard is counted once: adding a shard
+    that was already counted is a no-op, so it's safe to re-run over a growing list of shards. State can be saved to and
+    loaded from JSON, so counts survive between runs.
+    """
+
+    def __init__(self, column: str):
+        self.column: str = column
+        self.counts: Counter = Counter()
+        self.shards: Set[str] = set()
+
+    def add_shard(self, dataset: Dataset, shard_id: Optional[str] = None, num_proc: Optional[int] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> bool:
+        """
+        Count a new shard. shard_id identifies it (e.g. its file name), and defaults to the dataset's fingerprint,
+        which changes whenever its content does. Returns False if this shard was already counted.
+        """
+        shard_id = shard_id or dataset._fingerprint
+        if shard_id in self.shards:
+            return False
+        self.counts.update(count_column(dataset, self.column, num_proc=num_proc, batch_size=batch_size))
+        self.shards.add(shard_id)
+        return True
+
+    def save(self, path: str) -> None:
+        # a list of [value, count] pairs, not a dict: JSON object keys must be strings, but values may be ints, etc
+        with open(path, "w") as f:
+            json.dump({"column": self.column, "shards": sorted(self.shards),
+                       "counts": [[value, count] for value, count in self.counts.items()]}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IncrementalColumnCounter":
+        with open(path, "r") as f:
+            state = json.load(f)
+        counter = cls(state["column"])
+        counter.shards = set(state["shards"])
+        counter.counts = Counter({value: count for value, count in state["counts"]})
+        return counter
+
+
+if __name__ == '__main__':
+    from pprint import pprint
+
+    from datasets import load_dataset
+
+    dataset: Dataset = load_dataset("SetFit/20_newsgroups", split="train")
+
+    label_counter: Counter[str] = count_column(dataset, "label_text")
+    print("\n===== All label counts in SetFit/20_newsgroups (train) =====\n")
+    pprint(label_counter)
+
+    # same counts, counted in 4 processes
+    assert count_column(dataset, "label_text", num_proc=4, batch_size=2_000) == label_counter
+
+    print("\n===== Top-5 most common labels =====\n")
+    pprint(label_counter.most_common(5))
@@ -0,0 +1,217 @@
+"""
+Compact alternatives to the Book dataclass in dataclass_example.py, for when you have millions of small records.
+
+Each plain @dataclass instance carries its own __dict__, and dataclasses.asdict deep-copies every field on every call.
+Two alternatives:
+1) SlottedBook: @dataclass(slots=True, frozen=True). Same fields, but no per-instance __dict__, so each instance is
+   much smaller. frozen=True makes it immutable (and hashable)
+2) BookTable: a "struct of arrays". Instead of one object per book, one typed array per field:
+   - title: a plain list of str. Titles are (nearly) all distinct, so interning them would only add an id per row and
+     a dict entry per title
+   - author: each distinct string is stored once, and rows store an int id into that list (interning). Far fewer
+     authors than books, so this saves a string per row
+   - stars: array('b') (1 byte per book), with -1 meaning None
+   - available: array('b'), 0 or 1
+   Rows are read through lightweight BookView objects, and the whole table converts to dicts or a DataFrame in bulk.
+
+Run this file for a memory/construction-time benchmark against the plain dataclass + asdict. Every row still holds
+its own title string, so most of what BookTable saves over SlottedBook is per-object overhead, authors and stars.
+"""
+import dataclasses
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# -1 isn't a valid star rating, so we use it to represent stars=None in the array
+MISSING_STARS: int = -1
+
+
+@dataclass(slots=True, frozen=True)
+class SlottedBook:
+    title: str
+    author: str
+    stars: Optional[int] = None
+    available: bool = True
+
+
+class StringPool:
+    """
+    Stores each distinct string once, and hands out int ids for them. The string -> id dict is only needed while
+    interning: freeze() drops it (about as big as the strings themselves), and intern rebuilds it if called again.
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._ids: Optional[Dict[str, int]] = {}
+
+    def freeze(self) -> None:
+        self._ids = None
+
+    def intern(self, value: str) -> int:
+        if self._ids is None:
+            self._ids = {string: string_id for string_id, string in enumerate(self.strings)}
+        string_id: Optional[int] = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+
+class BookView:
+    """
+    A read-only view of one row of a BookTable. Holds only the table and the row number, not copies of the fields.
+    """
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "BookTable", row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def title(self) -> str:
+        return self._table.titles[self._row]
+
+    @property
+    def author(self) -> str:
+        return self._table.authors[self._table.author_ids[self._row]]
+
+    @property
+    def stars(self) -> Optional[int]:
+        stars: int = self._table.stars[self._row]
+        return None if stars == MISSING_STARS else stars
+
+    @property
+    def available(self) -> bool:
+        return bool(self._table.available[self._row])
+
+    def to_book(self) -> SlottedBook:
+        return SlottedBook(title=self.title, author=self.author, stars=self.stars, available=self.available)
+
+    def __repr__(self) -> str:
+        return f"BookView(title={self.title!r}, author={self.author!r}, stars={self.stars!r}, available={self.available!r})"
+
+
+class BookTable:
+    """
+    Many books, stored column by column in typed arrays. After appending books one at a time, call freeze() to free the
+    author pool's lookup dict (from_dicts does this itself).
+    """
+
+    def __init__(self):
+        self.titles: List[str] = []
+        self.authors: StringPool = StringPool()
+        # 'I' = unsigned int (4 bytes), enough for ~4 billion distinct authors
+        self.author_ids: array = array('I')
+        self.stars: array = array('b')
+        self.available: array = array('b')
+
+    def append(self, title: str, author: str, stars: Optional[int] = None, available: bool = True) -> None:
+        self.titles.append(title)
+        self.author_ids.append(self.authors.intern(author))
+        self.stars.append(MISSING_STARS if stars is None else stars)
+        self.available.append(1 if available else 0)
+
+    @classmethod
+    def from_dicts(cls, books: Iterable[Dict[str, Any]]) -> "BookTable":
+        """
+        Bulk construction from dicts like {'title': 'East of Eden', 'author': 'John Steinbeck'}. Missing stars and
+        available use the same defaults as Book.
+        """
+        books = books if isinstance(books, list) else list(books)
+        table = cls()
+        # build each column in one pass, instead of calling append (and unpacking **book) once per book
+        table.titles = [book["title"] for book in books]
+        table.author_ids = array('I', map(table.authors.intern, [book["author"] for book in books]))
+        table.freeze()
+        table.stars = array('b', [MISSING_STARS if (stars := book.get("stars")) is None else stars for book in books])
+        table.available = array('b', [1 if book.get("available", True) else 0 for book in books])
+        return table
+
+    def freeze(self) -> None:
+        self.authors.freeze()
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __getitem__(self, row: int) -> BookView:
+        if not -len(self) <= row < len(self):
+            raise IndexError(f"row {row} out of range for BookTable of length {len(self)}")
+        return BookView(self, row % len(self))
+
+    def __iter__(self) -> Iterator[BookView]:
+        return (BookView(self, row) for row in range(len(self)))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        The same dicts dataclasses.asdict would give for each Book, built column-wise instead of by deep-copying.
+        """
+        authors: List[str] = [self.authors[i] for i in self.author_ids]
+        return [{"title": title, "author": author, "stars": None if stars == MISSING_STARS else stars,
+                 "available": bool(available)}
+                for title, author, stars, available in zip(self.titles, authors, self.stars, self.available)]
+
+    def to_dataframe(self):
+        """
+        Export to a DataFrame. author becomes a categorical (the pool is already its categories), and stars is a
+        nullable Int8 column.
+        """
+        import numpy as np
+        import pandas as pd
+
+        stars = pd.array(np.frombuffer(self.stars, dtype=np.int8), dtype="Int8")
+        stars[stars == MISSING_STARS] = pd.NA
+        return pd.DataFrame({
+            "title": pd.Series(self.titles, dtype=object),
+            "author": pd.Categorical.from_codes(np.frombuffer(self.author_ids, dtype=np.uint32).astype(np.int64),
+                                                categories=pd.Index(self.authors.strings, dtype=object)),
+            "stars": stars,
+            "available": np.frombuffer(self.available, dtype=np.int8).astype(bool),
+        })
+
+
+if __name__ == '__main__':
+    import random
+    import time
+    import tracemalloc
+
+    from dataclass_example import Book
+
+    num_books: int = 200_000
+    random.seed(42)
+    # a realistic-ish mix: many books, far fewer distinct authors, some missing stars
+    book_dicts: List[Dict[str, Any]] = [{"title": f"Book {i}", "author": f"Author {i % 5000}",
+                                         "stars": random.choice([None, 1, 2, 3, 4, 5]), "available": i % 3 != 0}
+                                        for i in range(num_books)]
+
+    def measure(name: str, build):
+        tracemalloc.start()
+        start: float = time.perf_counter()
+        result = build()
+        elapsed: float = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<28} build: {elapsed * 1000:8.1f}ms   memory: {current / 2 ** 20:8.1f}MB   "
+              f"(peak {peak / 2 ** 20:.1f}MB)")
+        return result
+
+    # every variant keeps references to book_dicts' existing strings, so "memory" is only what each adds on top of them
+    print(f"\n===== Building {num_books} books =====\n")
+    books: List[Book] = measure("list[Book] (@dataclass)", lambda: [Book(**book) for book in book_dicts])
+    slotted: List[SlottedBook] = measure("list[SlottedBook] (slots)", lambda: [SlottedBook(**book) for book in book_dicts])
+    table: BookTable = measure("BookTable", lambda: BookTable.from_dicts(book_dicts))
+
+    print(f"\n===== Converting back to dicts =====\n")
+    start = time.perf_counter()
+    as_dicts: List[Dict[str, Any]] = [dataclasses.asdict(book) for book in books]
+    print(f"{'dataclasses.asdict':<28} {(time.perf_counter() - start) * 1000:8.1f}ms")
+    start = time.perf_counter()
+    table_dicts: List[Dict[str, Any]] = table.to_dicts()
+    print(f"{'BookTable.to_dicts':<28} {(time.perf_counter() - start) * 1000:8.1f}ms")
+    assert as_dicts == table_dicts
+
+    print(f"\n===== Row views =====\n")
+    print(table[0], table[-1], sep="\n")
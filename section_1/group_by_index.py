@@ -0,0 +1,122 @@
+"""
+A compact, saved group-by index for Hugging Face datasets, e.g. MultiWOZ turns grouped by dialogue_id.
+
+defaultdict_examples.py builds Dict[str, List[Turn]]: a full copy of every turn as a Python dict, rebuilt every run.
+For a big corpus, that's a lot of memory for what is really just "which rows belong to which dialogue". Here we store
+only row numbers, CSR-style (like a scipy sparse matrix):
+- keys: the distinct dialogue ids, in order of first appearance (same order as the defaultdict's keys). Keys keep
+  their type (rows_for(3) works on an int column), and rows with a null key are a group of their own, under None,
+  just like the defaultdict would put them under d[None]
+- indices: all row numbers, sorted so each dialogue's rows are next to each other (in their original order)
+- offsets: the rows for keys[k] are indices[offsets[k]:offsets[k + 1]]
+
+The arrays are saved as .npy files next to the dataset's cache files and memory-mapped when loaded. turns_for returns
+dataset.select(rows), which doesn't copy any data: it's a view of the same Arrow table.
+
+> index = GroupByIndex.load_or_build(dataset, "dialogue_id")
+> turns: Dataset = index.turns_for(dataset, "PMUL4398.json")
+"""
+import json
+import os
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+from datasets import Dataset
+
+# bump this if what's saved changes, so indexes saved by older code are rebuilt instead of misread (version 1 saved
+# every key as a string)
+INDEX_FORMAT_VERSION: int = 2
+
+
+class GroupByIndex:
+
+    def __init__(self, column: str, keys: List[Hashable], offsets: np.ndarray, indices: np.ndarray):
+        self.column: str = column
+        self.keys: List[Hashable] = keys
+        self.offsets: np.ndarray = offsets
+        self.indices: np.ndarray = indices
+        self._key_to_position: Dict[Hashable, int] = {key: k for k, key in enumerate(keys)}
+
+    @classmethod
+    def build(cls, dataset: Dataset, column: str) -> "GroupByIndex":
+        # only read the one column, as Arrow (no per-row dicts)
+        values = dataset.select_columns([column]).with_format("arrow")[column]
+        # codes[i] is the position of row i's key in keys. Arrow's dictionary encoding assigns codes in order of first
+        # appearance, and (unlike pandas, which would also turn an int column with nulls into floats) keeps the column's
+        # type. null_encoding="encode": nulls get a code (and a group) of their own, instead of a null code
+        encoded = values.combine_chunks().dictionary_encode(null_encoding="encode")
+        codes: np.ndarray = encoded.indices.to_numpy(zero_copy_only=False)
+        uniques: List[Hashable] = encoded.dictionary.to_pylist()
+        # a stable sort keeps each group's rows in their original order
+        indices: np.ndarray = np.argsort(codes, kind="stable").astype(np.int64)
+        offsets: np.ndarray = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(uniques))))).astype(np.int64)
+        # to_pylist() gives plain Python keys (JSON-serializable, and equal to the ones callers look up), null as None
+        return cls(column, uniques, offsets, indices)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._key_to_position
+
+    def rows_for(self, key: Hashable) -> np.ndarray:
+        k: int = self._key_to_position[key]
+        return self.indices[self.offsets[k]:self.offsets[k + 1]]
+
+    def turns_for(self, dataset: Dataset, key: Hashable) -> Dataset:
+        """
+        All rows with this key, as a (zero-copy) Dataset view. dataset must be the one this index was built from.
+        """
+        return dataset.select(self.rows_for(key))
+
+    @staticmethod
+    def default_directory(dataset: Dataset, column: str) -> str:
+        """
+        Next to the dataset's Arrow cache files, named by the dataset's fingerprint (which changes if its content
+        does, e.g. a different split slice), so a stale index is never loaded for the wrong data.
+        """
+        if not dataset.cache_files:
+            raise ValueError("dataset has no cache files (it's in memory), so pass a directory explicitly")
+        cache_dir: str = os.path.dirname(dataset.cache_files[0]["filename"])
+        return os.path.join(cache_dir, f"group_by_index-{column}-{dataset._fingerprint}")
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        np.save(os.path.join(directory, "indices.npy"), self.indices)
+        with open(os.path.join(directory, "keys.json"), "w") as f:
+            json.dump({"version": INDEX_FORMAT_VERSION, "column": self.column, "keys": self.keys}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "GroupByIndex":
+        with open(os.path.join(directory, "keys.json"), "r") as f:
+            state = json.load(f)
+        # mmap_mode='r': pages are read from disk on demand and shared between processes, not copied into memory
+        return cls(state["column"], state["keys"], np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r"),
+                   np.load(os.path.join(directory, "indices.npy"), mmap_mode="r"))
+
+    @classmethod
+    def load_or_build(cls, dataset: Dataset, column: str, directory: Optional[str] = None) -> "GroupByIndex":
+        directory = directory or cls.default_directory(dataset, column)
+        keys_path: str = os.path.join(directory, "keys.json")
+        if os.path.exists(keys_path):
+            with open(keys_path, "r") as f:
+                if json.load(f).get("version") == INDEX_FORMAT_VERSION:
+                    return cls.load(directory)
+        index = cls.build(dataset, column)
+        index.save(directory)
+        return index
+
+
+if __name__ == '__main__':
+    from pprint import pprint
+
+    from datasets import load_dataset
+
+    dataset: Dataset = load_dataset("Brendan/icdst_multiwoz_turns_v24", split="train[0:200]")
+
+    by_dialogue_id: GroupByIndex = GroupByIndex.load_or_build(dataset, "dialogue_id")
+    pprint(by_dialogue_id.keys)
+
+    first_dialogue: Dataset = by_dialogue_id.turns_for(dataset, by_dialogue_id.keys[0])
+    print(f"{by_dialogue_id.keys[0]} has {len(first_dialogue)} turns")
@@ -0,0 +1,262 @@
+"""
+An integer index over SST phrases, so phrase <-> sentence joins don't hash and compare long Python strings every time.
+
+The last pd.merge in stanford_tree_bank.py joins all_main.phrase to all_raw.sentence on the raw strings, and the
+~240k phrases in dictionary.txt get re-hashed on every run. Instead:
+1) build a PhraseIndex once: every distinct (normalized) phrase gets an integer id
+2) encode each file's text column to ids once (a vectorized lookup), and save the ids next to the index
+3) in later runs, load the saved id columns (no strings are normalized or hashed at all) and merge on the int columns
+
+Normalization is optional, and fixes mismatches between the two files: runs of whitespace, PTB bracket escapes like
+-LRB- for "(", and (if you want) case. Without normalization, the join matches exactly what the string merge does.
+
+The saved index remembers its normalization settings and a fingerprint of the phrases it was built from. load_or_build
+refuses a directory saved with other settings, and extends the index (existing ids don't change) when the phrases do.
+
+> index = PhraseIndex.load_or_build("sst_phrase_index", phrase_to_id["phrase"], normalize=True,
+>                                   source_path=dictionary_path)
+> phrase_to_id["phrase_pid"] = index.encoded_column("sst_phrase_index", "dictionary", dictionary_path,
+>                                                   phrase_to_id["phrase"])
+> ... the same for the sentences, then:
+> everything, report = index.join_encoded(all_main, all_raw, left_on="phrase_pid", right_on="sentence_pid")
+> print(report)  # how many rows the inner join dropped from each side
+"""
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Penn Treebank escapes used in SST for brackets
+PTB_ESCAPES: Dict[str, str] = {"-LRB-": "(", "-RRB-": ")", "-LSB-": "[", "-RSB-": "]", "-LCB-": "{", "-RCB-": "}"}
+_PTB_ESCAPE_PATTERN = re.compile("|".join(re.escape(escape) for escape in PTB_ESCAPES))
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_phrases(phrases: pd.Series, whitespace: bool = True, brackets: bool = True,
+                      lowercase: bool = False) -> pd.Series:
+    """
+    Normalize a column of phrases (vectorized with pandas .str methods).
+    """
+    phrases = phrases.astype(str)
+    if brackets:
+        phrases = phrases.str.replace(_PTB_ESCAPE_PATTERN, lambda match: PTB_ESCAPES[match.group(0)], regex=True)
+    if whitespace:
+        phrases = phrases.str.replace(_WHITESPACE_PATTERN, " ", regex=True).str.strip()
+    if lowercase:
+        phrases = phrases.str.lower()
+    return phrases
+
+
+def source_fingerprint(phrases: pd.Series, source_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Identifies the phrases an index was built from: source_path's size and modification time if given (cheap), else a
+    hash of the phrases themselves.
+    """
+    if source_path is not None:
+        stat = os.stat(source_path)
+        return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+    hasher = hashlib.blake2b(digest_size=16)
+    for phrase in phrases.astype(str):
+        hasher.update(phrase.encode("utf-8") + b"\n")
+    return {"phrases_hash": hasher.hexdigest(), "rows": len(phrases)}
+
+
+@dataclass
+class JoinReport:
+    left_rows: int
+    right_rows: int
+    joined_rows: int
+    # rows on each side with no match on the other, i.e. what an inner join drops
+    left_dropped: int
+    right_dropped: int
+
+
+@dataclass
+class PhraseIndex:
+    # phrases[i] is the (normalized) phrase with id i. None until needed, for an index loaded from directory: joining
+    # on saved id columns never needs the strings
+    phrases: Optional[pd.Index]
+    normalize: bool = False
+    lowercase: bool = False
+    size: int = 0
+    directory: Optional[str] = None
+    # source_fingerprint of the phrases this index was built from (or last extended with)
+    source: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def build(cls, phrases: Iterable[str], normalize: bool = False, lowercase: bool = False) -> "PhraseIndex":
+        series: pd.Series = pd.Series(list(phrases) if not isinstance(phrases, pd.Series) else phrases)
+        if normalize:
+            series = normalize_phrases(series, lowercase=lowercase)
+        # unique() keeps first-seen order, so ids are stable for the same input
+        unique: pd.Index = pd.Index(series.unique())
+        return cls(phrases=unique, normalize=normalize, lowercase=lowercase, size=len(unique))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _phrases(self) -> pd.Index:
+        if self.phrases is None:
+            with open(os.path.join(self.directory, "phrases.txt"), "r", encoding="utf-8") as f:
+                phrases = f.read().split("\n")[:-1]
+            if len(phrases) != self.size:
+                raise ValueError(f"expected {self.size} phrases in {self.directory}, found {len(phrases)}")
+            self.phrases = pd.Index(phrases)
+        return self.phrases
+
+    def encode(self, texts: pd.Series) -> np.ndarray:
+        """
+        Map each text to its phrase id, or -1 if it isn't in the index. Applies the same normalization as build.
+        """
+        if self.normalize:
+            texts = normalize_phrases(texts, lowercase=self.lowercase)
+        return self._phrases().get_indexer(texts)
+
+    def encoded_column(self, directory: str, name: str, source_path: str, texts: pd.Series) -> np.ndarray:
+        """
+        encode(texts), where texts is a column read from source_path, saved as <directory>/<name>.ids.npy. Later calls
+        load the saved ids instead of encoding, as long as source_path (size and modification time), the number of
+        rows and the index's size are unchanged.
+        """
+        ids_path: str = os.path.join(directory, f"{name}.ids.npy")
+        meta_path: str = os.path.join(directory, f"{name}.ids.json")
+        stat = os.stat(source_path)
+        meta: Dict[str, Any] = {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns, "rows": len(texts),
+                                "index_size": len(self), "index_source": self.source}
+        if os.path.exists(ids_path) and os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                if json.load(f) == meta:
+                    return np.load(ids_path)
+        ids: np.ndarray = self.encode(texts).astype(np.int64)
+        os.makedirs(directory, exist_ok=True)
+        np.save(ids_path, ids)
+        # meta last: ids without a matching meta file are never trusted
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        return ids
+
+    def extend(self, phrases: Iterable[str]) -> None:
+        """
+        Add new phrases (e.g. from another split). Existing ids don't change.
+        """
+        series: pd.Series = pd.Series(list(phrases))
+        if self.normalize:
+            series = normalize_phrases(series, lowercase=self.lowercase)
+        known: pd.Index = self._phrases()
+        new_phrases: np.ndarray = series[known.get_indexer(series) == -1].unique()
+        self.phrases = known.append(pd.Index(new_phrases))
+        self.size = len(self.phrases)
+
+    def join_encoded(self, left: pd.DataFrame, right: pd.DataFrame, left_on: str, right_on: str,
+                     how: str = "inner") -> Tuple[pd.DataFrame, JoinReport]:
+        """
+        pd.merge on two integer phrase id columns (from encode / encoded_column). Ids of -1 (not in the index) never
+        match anything.
+        """
+        left_ids: np.ndarray = np.asarray(left[left_on], dtype=np.int64)
+        right_ids: np.ndarray = np.asarray(right[right_on], dtype=np.int64)
+        # unknown texts: -1 on the left, -2 on the right, so they can't match each other
+        right_key: np.ndarray = np.where(right_ids == -1, -2, right_ids)
+        joined: pd.DataFrame = pd.merge(left.assign(_phrase_id=left_ids), right.assign(_phrase_id=right_key),
+                                        on="_phrase_id", how=how).drop(columns="_phrase_id")
+        # ids are dense in [0, len(self)), so "is this id on the other side" is a boolean array lookup, no hashing
+        in_left: np.ndarray = np.zeros(len(self) + 1, dtype=bool)
+        in_right: np.ndarray = np.zeros(len(self) + 1, dtype=bool)
+        in_left[left_ids] = True
+        in_right[right_ids] = True
+        # index -1 is the extra last slot: unknown texts never count as matched
+        in_left[-1] = in_right[-1] = False
+        report = JoinReport(left_rows=len(left), right_rows=len(right), joined_rows=len(joined),
+                            left_dropped=int(np.sum(~in_right[left_ids])),
+                            right_dropped=int(np.sum(~in_left[right_ids])))
+        return joined, report
+
+    def join(self, left: pd.DataFrame, right: pd.DataFrame, left_on: str, right_on: str,
+             how: str = "inner") -> Tuple[pd.DataFrame, JoinReport]:
+        """
+        Like pd.merge(left, right, left_on=left_on, right_on=right_on, how=how), but merging on integer phrase ids.
+        This encodes both text columns first; to skip that on every run, save the ids with encoded_column and use
+        join_encoded.
+        """
+        left = left.assign(_left_pid=self.encode(left[left_on]))
+        right = right.assign(_right_pid=self.encode(right[right_on]))
+        joined, report = self.join_encoded(left, right, left_on="_left_pid", right_on="_right_pid", how=how)
+        return joined.drop(columns=["_left_pid", "_right_pid"]), report
+
+    def save(self, directory: str) -> None:
+        """
+        Save as phrases.txt (one phrase per line, line number = id) + settings.json.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "phrases.txt"), "w", encoding="utf-8") as f:
+            for phrase in self._phrases():
+                # phrases are single lines in dictionary.txt, but make sure: a newline would shift every later id
+                f.write(phrase.replace("\n", " ") + "\n")
+        with open(os.path.join(directory, "settings.json"), "w") as f:
+            json.dump({"normalize": self.normalize, "lowercase": self.lowercase, "size": len(self),
+                       "source": self.source}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "PhraseIndex":
+        """
+        Only reads settings.json: phrases.txt is read the first time something needs the strings (encode, extend).
+        """
+        with open(os.path.join(directory, "settings.json"), "r") as f:
+            settings = json.load(f)
+        return cls(phrases=None, normalize=settings["normalize"], lowercase=settings["lowercase"],
+                   size=settings["size"], directory=directory, source=settings.get("source"))
+
+    @classmethod
+    def load_or_build(cls, directory: str, phrases: Iterable[str], normalize: bool = False, lowercase: bool = False,
+                      source_path: Optional[str] = None) -> "PhraseIndex":
+        """
+        Load the index saved in directory, or build (and save) one from phrases.
+
+        :param source_path: the file phrases were read from. Its size and modification time tell whether the phrases
+            changed since the index was saved; without it, the phrases are hashed on every call
+        :raises ValueError: if the saved index has different normalize / lowercase settings (use another directory)
+        """
+        phrases = phrases if isinstance(phrases, pd.Series) else pd.Series(list(phrases))
+        source: Dict[str, Any] = source_fingerprint(phrases, source_path)
+        if os.path.exists(os.path.join(directory, "settings.json")):
+            index: PhraseIndex = cls.load(directory)
+            if (index.normalize, index.lowercase) != (normalize, lowercase):
+                raise ValueError(f"the index in {directory} was built with normalize={index.normalize}, "
+                                 f"lowercase={index.lowercase}, not normalize={normalize}, lowercase={lowercase}")
+            if index.source != source:
+                # the phrases changed: add the new ones (existing ids, and so saved id columns, stay valid)
+                index.extend(phrases)
+                index.source = source
+                index.save(directory)
+            return index
+        index = cls.build(phrases, normalize=normalize, lowercase=lowercase)
+        index.source = source
+        index.save(directory)
+        index.directory = directory
+        return index
+
+
+if __name__ == '__main__':
+    sst_dir: str = "class_assignments/ca1/section5"
+    index_dir: str = os.path.join(sst_dir, "sst_phrase_index")
+    sentences_path: str = os.path.join(sst_dir, "stanfordSentimentTreebankRaw/sentlex_exp12.txt")
+    dictionary_path: str = os.path.join(sst_dir, "stanfordSentimentTreebank/dictionary.txt")
+
+    sent_id_to_sent: pd.DataFrame = pd.read_csv(sentences_path, names=["id", "sentence"])
+    phrase_to_id: pd.DataFrame = pd.read_csv(dictionary_path, delimiter='|', names=["phrase", "phrase_id"])
+
+    index: PhraseIndex = PhraseIndex.load_or_build(index_dir, phrase_to_id["phrase"], normalize=True,
+                                                   source_path=dictionary_path)
+    # encoded on the first run only, loaded from index_dir after that
+    phrase_to_id["phrase_pid"] = index.encoded_column(index_dir, "dictionary", dictionary_path, phrase_to_id["phrase"])
+    sent_id_to_sent["sentence_pid"] = index.encoded_column(index_dir, "sentences", sentences_path,
+                                                           sent_id_to_sent["sentence"])
+
+    joined, report = index.join_encoded(phrase_to_id, sent_id_to_sent, left_on="phrase_pid", right_on="sentence_pid")
+    print(report)
+    print(joined.head())
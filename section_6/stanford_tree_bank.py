@@ -1,21 +1,28 @@
+import os
+import sys
+
 import pandas as pd
-import numpy as np
-import csv
 import matplotlib.pyplot as plt
 
+from sst_phrase_index import PhraseIndex
+from sst_raw_scores import load_raw_scores
+
+# dense_plots.py lives at the root of this repo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dense_plots import density_scatter
+
 
-sent_id_to_sent: pd.DataFrame = pd.read_csv("class_assignments/ca1/section5/stanfordSentimentTreebankRaw/sentlex_exp12.txt",
-                                            names=["id", "sentence"])
+SENTENCES_PATH: str = "class_assignments/ca1/section5/stanfordSentimentTreebankRaw/sentlex_exp12.txt"
+DICTIONARY_PATH: str = "/home/bking2/nlp220/section_examples/class_assignments/ca1/section5/stanfordSentimentTreebank/dictionary.txt"
+# integer ids for every phrase, and for the phrase / sentence columns below, built on the first run (see sst_phrase_index.py).
+# No normalization, so the join matches exactly what a merge on the strings would
+PHRASE_INDEX_DIR: str = "class_assignments/ca1/section5/sst_phrase_index_exact"
+
+sent_id_to_sent: pd.DataFrame = pd.read_csv(SENTENCES_PATH, names=["id", "sentence"])
 
-frame_content = []
 # This CSV is more annoying, there is an id followed by an arbitrary number of raw scores, which we will average, to build a frame
-# from sent_id to raw_score average
-with open("/home/bking2/nlp220/section_examples/class_assignments/ca1/section5/stanfordSentimentTreebankRaw/rawscores_exp12.txt", "r") as f:
-    reader = csv.reader(f)
-    for row in reader:
-        
-        frame_content.append({"id": int(row[0]), "raw_score": np.mean([int(score) for score in row[1:]])})
-sent_id_to_raw_score: pd.DataFrame = pd.DataFrame(frame_content)
+# from sent_id to raw_score average. load_raw_scores parses it in bulk and averages every row at once (see sst_raw_scores.py)
+sent_id_to_raw_score: pd.DataFrame = load_raw_scores("/home/bking2/nlp220/section_examples/class_assignments/ca1/section5/stanfordSentimentTreebankRaw/rawscores_exp12.txt")
 
 
 
@@ -24,15 +31,26 @@ all_raw: pd.DataFrame = pd.merge(sent_id_to_sent, sent_id_to_raw_score, on='id',
 
 phrase_id_to_score: pd.DataFrame = pd.read_csv("/home/bking2/nlp220/section_examples/class_assignments/ca1/section5/stanfordSentimentTreebank/sentiment_labels.txt",
                                                delimiter='|', names=["phrase_id", "score"], skiprows=1)
-phrase_to_id: pd.DataFrame = pd.read_csv("/home/bking2/nlp220/section_examples/class_assignments/ca1/section5/stanfordSentimentTreebank/dictionary.txt", 
-                                         delimiter='|', names=["phrase", "phrase_id"])
+phrase_to_id: pd.DataFrame = pd.read_csv(DICTIONARY_PATH, delimiter='|', names=["phrase", "phrase_id"])
+
+phrase_index: PhraseIndex = PhraseIndex.load_or_build(PHRASE_INDEX_DIR, phrase_to_id["phrase"], source_path=DICTIONARY_PATH)
+phrase_to_id["phrase_pid"] = phrase_index.encoded_column(PHRASE_INDEX_DIR, "dictionary", DICTIONARY_PATH, phrase_to_id["phrase"])
+sent_id_to_sent["sentence_pid"] = phrase_index.encoded_column(PHRASE_INDEX_DIR, "sentences", SENTENCES_PATH,
+                                                              sent_id_to_sent["sentence"])
 
 all_main: pd.DataFrame = pd.merge(phrase_id_to_score, phrase_to_id, on="phrase_id", how="inner")
 
 # inner will lose some rows, but as long as we get most of them we should have enough 'samples' from which to infer score
-everything: pd.DataFrame = pd.merge(all_main, all_raw, left_on="phrase", right_on="sentence", how="inner")
-
-ax = everything.plot.scatter(x="raw_score", y="score", title="Scores vs. Raw Scores in Stanford Sentiment Tree Bank")
+# joined on the integer phrase ids instead of the strings: the same rows as
+# pd.merge(all_main, all_raw, left_on="phrase", right_on="sentence", how="inner")
+everything, join_report = phrase_index.join_encoded(all_main, all_raw, left_on="phrase_pid", right_on="sentence_pid")
+print(join_report)
+
+# the same scatter as everything.plot.scatter(x="raw_score", y="score"), until there are too many rows to draw one marker
+# each: then density_scatter bins them and draws the density instead (see dense_plots.py)
+fig, ax = plt.subplots()
+density_scatter(everything["raw_score"], everything["score"], ax=ax)
+ax.set(xlabel="raw_score", ylabel="score", title="Scores vs. Raw Scores in Stanford Sentiment Tree Bank")
 
 plt.savefig("class_assignments/ca1/section_6/scores_vs_raw_scores.png")
 plt.close()
\ No newline at end of file
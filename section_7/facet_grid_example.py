@@ -42,4 +42,41 @@ g.fig.subplots_adjust(top=0.75)  # Adjust the top to make room for the title
 # Adding a legend
 g.add_legend()
 
-plt.savefig('iris_facet_grid_example_multicolor.png')
\ No newline at end of file
+plt.savefig('iris_facet_grid_example_multicolor.png')
+
+# =================== A Third Example: Plotting Millions of Points =====================
+
+# plt.scatter draws one marker per point, so at millions of rows it's slow, the file is huge, and the plot is a solid
+# blob anyway. density_scatter (see dense_plots.py, at the root of this repo) works like plt.scatter, but above a
+# threshold (50k points by default) it bins the points with NumPy and draws the density instead
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dense_plots import BinCache, data_extent, density_scatter, max_count, prebin_facets
+
+# a stand-in for a big dataset: 1M jittered copies of each species' rows
+rng: np.random.Generator = np.random.default_rng(42)
+big_df: pd.DataFrame = df.sample(n=3_000_000, replace=True, random_state=42).reset_index(drop=True)
+big_df["sepal_length"] += rng.normal(0, 0.15, len(big_df))
+big_df["sepal_width"] += rng.normal(0, 0.15, len(big_df))
+
+# bin every facet over the same extent, so their bins line up, and in parallel. The bins are cached, so re-drawing with
+# different styling (try mode="hexbin" below, after changing it here too) doesn't re-bin
+bin_cache: BinCache = BinCache()
+extent = data_extent(big_df["sepal_length"], big_df["sepal_width"])
+facet_bins = prebin_facets(big_df, "sepal_length", "sepal_width", col="species", extent=extent, cache=bin_cache)
+
+g: sns.FacetGrid = sns.FacetGrid(big_df, col="species", hue='species', palette=palette)
+
+# extra keyword args to g.map are passed on to density_scatter for every facet. The same vmax (the densest bin of any
+# facet) colors every facet on the same scale, so the same shade means the same density in each
+g.map(density_scatter, "sepal_length", "sepal_width", extent=extent, cache=bin_cache,
+      vmax=max_count(facet_bins.values()))
+
+g.fig.suptitle("Sepal Length vs Width by Species, 3M (jittered) Points", fontsize=16)
+g.fig.subplots_adjust(top=0.75)  # Adjust the top to make room for the title
+
+plt.savefig('iris_facet_grid_example_density.png')